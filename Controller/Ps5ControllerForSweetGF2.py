@@ -1,24 +1,34 @@
 #甜蜜女友2，启动
+import os
+import sys
 import pygame
-import pyautogui
-import time
-import math
 import ctypes  # 用于获取屏幕分辨率
 
+# 键鼠输入后端和红包脚本共用一份（opencv_redbag/input_backend.py）
+# 加在最后：opencv_redbag里也有replay.py，不能让它挡住这个目录里的同名模块
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'opencv_redbag'))
+from input_backend import make_backend
+
+from event_loop import EventLoop, pygame_wait
+from injector import InjectionWorker
+from mapper import BUTTON_MAPPING, BUTTON_MODES, ControllerMapper
+from output_engine import OutputEngine
+
 # -------------------------- 1. 初始化（适配PS5手柄） --------------------------
 pygame.init()
 pygame.joystick.init()
 
-# 禁用PyAutoGUI的安全机制（防止鼠标移到角落报错）
-pyautogui.FAILSAFE = False
-# 提高PyAutoGUI操作速度
-pyautogui.PAUSE = 0.001
+# 键鼠输入后端：'auto'（本机能用的里面挑最快的）、'pyautogui'、'xtest'、'uinput'
+# pyautogui后端会关掉安全机制（防止鼠标移到角落报错），PAUSE改成0
+INPUT_BACKEND = 'auto'
 
 # 获取屏幕分辨率用于动态调整速度
 user32 = ctypes.windll.user32
 SCREEN_WIDTH = user32.GetSystemMetrics(0)
 SCREEN_HEIGHT = user32.GetSystemMetrics(1)
 
+backend = make_backend(INPUT_BACKEND, screen=(SCREEN_WIDTH, SCREEN_HEIGHT))
+
 # 连接PS5手柄（若连接多个，调整索引0为对应序号）
 try:
     joystick = pygame.joystick.Joystick(0)
@@ -29,157 +39,65 @@ except pygame.error:
     exit()
 
 # PS5手柄专属配置（灵敏度、死区适配）
-BASE_SPEED = 10  # 基础速度（提高默认值）
-MAX_SPEED = 30  # 最大速度（大幅提高）
+BASE_SPEED = 2000  # 基础速度，像素/秒（原来每5ms走10像素）
+MAX_SPEED = 6000  # 最大速度，像素/秒（原来每5ms走30像素）
 DEAD_ZONE = 0.1  # 稍减小死区，提高响应
 TRIGGER_THRESHOLD = 0.3  # 扳机键触发阈值
-KEY_DELAY = 0.03  # 减少按键延迟
-SMOOTHING_FACTOR = 0.5  # 降低平滑因子，提高响应速度
-UPDATE_INTERVAL = 0.005  # 减少循环间隔，提高更新频率
-
-# 用于平滑处理的变量
-prev_x, prev_y = 0, 0
-
-# -------------------------- 2. PS5手柄按键映射表（预设常用键） --------------------------
-BUTTON_MAPPING = {
-    0: "left_click",  # ×键 → 鼠标左键
-    1: "right_click",  # ○键 → 鼠标右键
-    2: "keyboard_space",  # □键 → 隐藏对话框
-    3: "keyboard_ctrl",  # △键 → 按住文本跳过
-    9: "keyboard_f6",  # L1键 → 移动到上一个选项
-    10: "keyboard_f7",  # R1键 → 移动到下一个选项
-    15: "keyboard_enter",  # 触控板按下 → 键盘回车
-    6: "keyboard_esc",  #右上角按键 → esc
-    4: "keyboard_tab",  #左上角按键 → 显示后台日志
-    7: "keyboard_f8",  #左摇杆按下 → 跳过h场景
-    8: "keyboard_f12",  #右摇杆按下 → 最小化
-    
-    # 方向键映射
-    11: "keyboard_f1",   # 上方向键 → 快速存档
-    12: "keyboard_f2",   # 下方向键 → 快速读档
-    13: "keyboard_f5",   # 左方向键 → 自动速度减慢
-    14: "keyboard_f4"    # 右方向键 → 自动速度加快
-}
-
-
-# -------------------------- 3. 核心功能 --------------------------
-def get_ps5_joystick_move():
-    """读取PS5左摇杆，控制鼠标移动（高速流畅版）"""
-    global prev_x, prev_y
-    
-    left_x = joystick.get_axis(0)  # 左摇杆X轴
-    left_y = joystick.get_axis(1)  # 左摇杆Y轴
-
-    # 死区过滤
-    if abs(left_x) < DEAD_ZONE:
-        left_x = 0
-    if abs(left_y) < DEAD_ZONE:
-        left_y = 0
-    
-    # 计算摇杆偏离中心的距离
-    magnitude = math.sqrt(left_x**2 + left_y**2)
-    
-    # 应用改进的加速度曲线：更快速达到高速
-    if magnitude > 0:
-        # 使用平方曲线替代立方曲线，更快达到高速
-        speed_factor = BASE_SPEED + (MAX_SPEED - BASE_SPEED) * (magnitude ** 2)
-        
-        # 归一化方向
-        left_x_normalized = left_x / magnitude
-        left_y_normalized = left_y / magnitude
-        
-        # 计算目标速度
-        target_x = left_x_normalized * speed_factor
-        target_y = left_y_normalized * speed_factor
-        
-        # 平滑过渡：使用较低的平滑因子，提高响应性
-        smooth_x = prev_x * SMOOTHING_FACTOR + target_x * (1 - SMOOTHING_FACTOR)
-        smooth_y = prev_y * SMOOTHING_FACTOR + target_y * (1 - SMOOTHING_FACTOR)
-        
-        # 更新上一次的移动值
-        prev_x, prev_y = smooth_x, smooth_y
-        
-        return smooth_x, smooth_y
-    
-    # 如果摇杆在死区内，重置平滑值
-    prev_x, prev_y = 0, 0
-    return 0, 0
-
-def handle_ps5_right_joystick_as_arrow_keys():
-    """读取PS5右摇杆，模拟电脑方向键"""
-    right_x = joystick.get_axis(2)  
-    right_y = joystick.get_axis(3) 
-
-    # 死区过滤
-    dead_zone = 0.4  # 稍减小死区
-    right_x = 0 if abs(right_x) < dead_zone else right_x
-    right_y = 0 if abs(right_y) < dead_zone else right_y
-
-    # 释放所有方向键
-    pyautogui.keyUp('up')
-    pyautogui.keyUp('down')
-    pyautogui.keyUp('left')
-    pyautogui.keyUp('right')
-
-    # 根据摇杆方向按下对应的方向键
-    if right_y < -dead_zone:
-        pyautogui.keyDown('up')
-    elif right_y > dead_zone:
-        pyautogui.keyDown('down')
-
-    if right_x < -dead_zone:
-        pyautogui.keyDown('left')
-    elif right_x > dead_zone:
-        pyautogui.keyDown('right')
-
-
-def get_ps5_trigger():
-    """读取PS5扳机键（L2=滚轮上滚，R2=滚轮下滚）"""
-    l2_value = joystick.get_axis(2)
-    r2_value = joystick.get_axis(5)
-
-    # 增加滚轮速度
-    scroll_amount = 2 if l2_value > TRIGGER_THRESHOLD * 1.5 else 1
-    if l2_value > TRIGGER_THRESHOLD:
-        pyautogui.scroll(scroll_amount)
-    elif r2_value > TRIGGER_THRESHOLD:
-        pyautogui.scroll(-scroll_amount)
-
-
-# -------------------------- 4. 主循环（监听PS5手柄输入） --------------------------
+KEY_DELAY = 0.03  # 点一下的键按下到松开的时间（注入线程自己松开，主循环不等）
+SMOOTHING_FACTOR = 0.5  # 降低平滑因子，提高响应速度（每5ms旧速度保留的比例，刷新间隔变了会自动换算）
+UPDATE_INTERVAL = 0.008  # 摇杆推出去时的刷新间隔（速度按像素/秒算，刷新慢一点鼠标速度也不变；摇杆都在死区里时不刷新，只等按键事件）
+SCROLL_SPEED = 200  # 扳机键滚轮速度，每秒滚多少（原来每5ms滚1下），按深了翻倍
+RIGHT_DEAD_ZONE = 0.4  # 右摇杆（方向键）的死区
+REPEAT_DELAY = 0.4  # 按住连发：按下多久以后开始连发
+REPEAT_INTERVAL = 0.05  # 按住连发：之后每隔多久再发一次
+ARROW_REPEAT = True  # 右摇杆推着不放时方向键是否连发（False就是一直按着）
+RECORD_TRACE = None  # 录下手柄输入给replay.py回放测速，比如 'trace.jsonl'
+
+# 键鼠事件都交给单独的注入线程发，主循环只排队，不会因为按键卡住鼠标移动
+injector = InjectionWorker(backend, KEY_DELAY)
+# 只在状态变化时发键鼠事件（方向键不再每一轮都松开再按下）
+output = OutputEngine(injector, REPEAT_DELAY, REPEAT_INTERVAL)
+
+# 手柄→键鼠的映射逻辑在mapper.py里（按键映射表BUTTON_MAPPING、BUTTON_MODES也在那里改），
+# replay.py用假手柄回放测速跑的也是同一套
+mapper = ControllerMapper(joystick, output, injector, BASE_SPEED, MAX_SPEED, DEAD_ZONE, SMOOTHING_FACTOR,
+                          RIGHT_DEAD_ZONE, TRIGGER_THRESHOLD, SCROLL_SPEED, ARROW_REPEAT,
+                          BUTTON_MAPPING, BUTTON_MODES)
+
+recorder = None
+if RECORD_TRACE:
+    from replay import TraceRecorder
+    recorder = TraceRecorder(RECORD_TRACE)
+
+
+def handle_events(events):
+    """处理按键→键鼠操作（事件一到就处理）"""
+    for event in events:
+        if recorder is not None:
+            recorder.record(event)
+        if event.type in (pygame.JOYBUTTONDOWN, pygame.JOYBUTTONUP):
+            mapper.button(event.button, event.type == pygame.JOYBUTTONDOWN)
+
+
+# -------------------------- 2. 主循环（监听PS5手柄输入） --------------------------
+# 摇杆都在死区里时阻塞等手柄事件（几乎不占CPU），推出去了才按UPDATE_INTERVAL刷新
+loop = EventLoop(pygame_wait, handle_events, mapper.needs_tick, mapper.tick, UPDATE_INTERVAL)
 print("PS5手柄模拟键鼠已启动（按 Ctrl+C 退出）")
 print(f"屏幕分辨率: {SCREEN_WIDTH}x{SCREEN_HEIGHT} - 已优化速度适配")
 try:
-    while True:
-        # 处理摇杆→鼠标移动
-        move_x, move_y = get_ps5_joystick_move()
-        if move_x != 0 or move_y != 0:
-            # 使用pyautogui的duration参数实现更平滑的移动
-            pyautogui.moveRel(move_x, move_y, duration=UPDATE_INTERVAL)
-
-        handle_ps5_right_joystick_as_arrow_keys()
-
-        # 处理扳机键→滚轮
-        get_ps5_trigger()
-
-        # 处理按键→键鼠操作
-        for event in pygame.event.get():
-            if event.type == pygame.JOYBUTTONDOWN:
-                button_id = event.button
-                if button_id in BUTTON_MAPPING:
-                    action = BUTTON_MAPPING[button_id]
-                    if action.startswith("keyboard_"):
-                        pyautogui.press(action.split("_")[1])
-                        time.sleep(KEY_DELAY)
-                    else:
-                        pyautogui.click(button=action.split("_")[0])
-                        time.sleep(KEY_DELAY)
-
-        # 减少循环间隔，提高响应速度
-        time.sleep(UPDATE_INTERVAL)
+    loop.run()
 except KeyboardInterrupt:
     print("程序已退出")
 finally:
+    output.release_all()   # 别把Ctrl之类的留在按下的状态
+    injector.close()
+    if recorder is not None:
+        recorder.close()
+    print(loop.report())
+    print(output.report())
+    print(injector.report())   # 每种动作的排队延迟
+    print(backend.report())   # 每种键鼠调用的耗时
+    backend.close()
     joystick.quit()
     pygame.quit()
     
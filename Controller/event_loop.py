@@ -0,0 +1,91 @@
+#事件驱动的主循环：摇杆都在死区里时阻塞等手柄事件，不占CPU；
+#有摇杆/扳机推出去了才按固定频率刷新（移动鼠标、方向键、滚轮），按键事件一到就处理，不用等下一轮
+#不依赖pygame本身，等事件的函数从外面传进来，没有手柄也能用假的事件源跑
+
+import math
+import time
+
+
+def wait_ms(timeout):
+    """
+    timeout秒换成pygame.event.wait的毫秒数：向上取整，宁可晚一点点醒，也不要提前醒了再空转一圈。
+    timeout<=0（刷新时间已经过了）返回None，表示不等，只把已经到了的事件取出来：
+    pygame 2里wait(0)是一直等到有事件，摇杆推着不动时就再也不刷新了。
+    """
+    if timeout <= 0:
+        return None
+    return max(math.ceil(timeout * 1000), 1)
+
+
+def pygame_wait(timeout):
+    """
+    pygame的等事件：timeout秒内等到第一个事件，再把队列里剩下的一起取出来，返回事件列表（超时返回空列表）。
+    """
+    import pygame
+    ms = wait_ms(timeout)
+    if ms is None:
+        return pygame.event.get()
+    event = pygame.event.wait(ms)
+    events = [] if event.type == pygame.NOEVENT else [event]
+    events.extend(pygame.event.get())
+    return events
+
+
+class EventLoop:
+    """
+    wait(timeout)     等事件，返回事件列表
+    on_events(events) 处理按键等事件（每次醒来只要有事件就马上调用）
+    is_active()       现在有没有摇杆/扳机不在死区里
+    on_tick(now)      固定频率的刷新；从活动变回静止时会再调用一次，让它把状态归零（松开方向键、清掉平滑值）
+
+    静止时每次最多等idle_timeout秒（不用无限等，Ctrl+C才能及时生效）。
+    """
+
+    def __init__(self, wait, on_events, is_active, on_tick, tick_interval=0.005, idle_timeout=0.5,
+                 clock=time.perf_counter):
+        self.wait = wait
+        self.on_events = on_events
+        self.is_active = is_active
+        self.on_tick = on_tick
+        self.tick_interval = tick_interval
+        self.idle_timeout = idle_timeout
+        self.clock = clock
+        self.active = False
+        self.next_tick = 0.0
+        self.wakeups = 0        # 醒来的次数
+        self.ticks = 0          # 刷新的次数
+        self.events = 0         # 处理的事件数
+
+    def run_once(self):
+        if self.active:
+            timeout = max(self.next_tick - self.clock(), 0.0)
+        else:
+            timeout = self.idle_timeout
+        events = self.wait(timeout)
+        self.wakeups += 1
+        if events:
+            self.events += len(events)
+            self.on_events(events)
+
+        now = self.clock()
+        active = self.is_active()
+        if active:
+            if not self.active:
+                self.next_tick = now      # 刚推出去，马上动
+            if now >= self.next_tick:
+                self.on_tick(now)
+                self.ticks += 1
+                self.next_tick += self.tick_interval
+                if self.next_tick < now:  # 卡了很久就不补了，从现在重新算
+                    self.next_tick = now + self.tick_interval
+        elif self.active:
+            self.on_tick(now)
+            self.ticks += 1
+        self.active = active
+
+    def run(self, stop=lambda: False):
+        while not stop():
+            self.run_once()
+
+    def report(self):
+        return f"主循环：醒来 {self.wakeups} 次，刷新 {self.ticks} 次，处理事件 {self.events} 个"
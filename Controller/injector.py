@@ -0,0 +1,191 @@
+#键鼠注入线程：主循环只把动作放进有界队列就返回，真正调用输入后端的是单独的一个线程
+#按键不再在主循环里sleep，鼠标移动也不会因为按键卡住
+#  鼠标相对移动会合并：队列里最多只有一个待发的移动，后来的移动量直接加到它上面
+#  tap（press/click）是先按下，过tap_time以后由注入线程自己松开，不用sleep等
+#  队列满了丢新动作，但松开（key_up/mouse_up）不丢，不然键会一直按着
+#每个动作从放进队列到开始执行等了多久都记下来（排队延迟）
+
+import queue
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+# 队列满了也不能丢的动作
+RELEASES = ('key_up', 'mouse_up')
+
+
+class InjectionWorker:
+    """
+    和输入后端（input_backend.Backend）一样的接口：move_rel / move_to / click / mouse_down / mouse_up /
+    key_down / key_up / press / scroll，调用时只是排队，立刻返回。
+    队列满了（注入线程卡住了）新动作会被丢掉并计数，主循环永远不会被挡住；
+    只有松开不丢：放进overflow排在队列后面，这之后来的动作也都排在它后面（放不下的丢掉），保证先后顺序不乱。
+    """
+
+    def __init__(self, backend, tap_time=0.03, maxsize=256, keep=1000, clock=time.perf_counter):
+        self.backend = backend
+        self.tap_time = tap_time            # tap时按下到松开的时间
+        self.clock = clock
+        self.queue = queue.Queue(maxsize)
+        self.move_lock = threading.Lock()
+        self.move_pending = None            # 还没发出去的合并移动量 [dx, dy]，None表示队列里没有移动
+        self.put_lock = threading.Lock()
+        self.overflow = []                  # 队列满了时排在队列后面的松开动作，队列空了注入线程接着发
+        self.releases = []                  # (松开的时间, 调用名, 参数)，tap用
+        self.delays = {}                    # 动作名 -> 最近keep次的排队延迟（秒）
+        self.counts = {}
+        self.keep = keep
+        self.dropped = 0
+        self.merged = 0                     # 合并掉的移动次数
+        self.error = None
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name='injector', daemon=True)
+        self.thread.start()
+
+    # ---------------- 主循环这边调用的，都只是排队 ----------------
+    def _put(self, call, *args):
+        """排队，放不下返回False"""
+        item = (self.clock(), call, args)
+        with self.put_lock:
+            if not self.overflow:
+                try:
+                    self.queue.put_nowait(item)
+                    return True
+                except queue.Full:
+                    pass
+            if call in RELEASES:
+                self.overflow.append(item)
+                return True
+            self.dropped += 1
+            return False
+
+    def move_rel(self, dx, dy):
+        with self.move_lock:
+            if self.move_pending is not None:
+                self.move_pending[0] += dx
+                self.move_pending[1] += dy
+                self.merged += 1
+                return
+            self.move_pending = [dx, dy]
+        if not self._put('move_rel'):
+            # 这次的移动没排上队就一起丢掉，不然后面的移动都合并进一个永远不会发的移动里
+            with self.move_lock:
+                self.move_pending = None
+
+    def move_to(self, x, y):
+        self._put('move_to', x, y)
+
+    def click(self, x=None, y=None, button='left'):
+        self._put('click', x, y, button)
+
+    def mouse_down(self, button='left'):
+        self._put('mouse_down', button)
+
+    def mouse_up(self, button='left'):
+        self._put('mouse_up', button)
+
+    def key_down(self, key):
+        self._put('key_down', key)
+
+    def key_up(self, key):
+        self._put('key_up', key)
+
+    def press(self, key):
+        self._put('press', key)
+
+    def scroll(self, clicks):
+        self._put('scroll', clicks)
+
+    # ---------------- 注入线程 ----------------
+    def _execute(self, call, args):
+        backend = self.backend
+        if call == 'move_rel':
+            with self.move_lock:
+                dx, dy = self.move_pending
+                self.move_pending = None
+            backend.move_rel(dx, dy)
+        elif call == 'press':
+            backend.key_down(args[0])
+            self.releases.append((self.clock() + self.tap_time, 'key_up', args))
+        elif call == 'click':
+            x, y, button = args
+            if x is not None and y is not None:
+                backend.move_to(x, y)
+            backend.mouse_down(button)
+            self.releases.append((self.clock() + self.tap_time, 'mouse_up', (button,)))
+        else:
+            getattr(backend, call)(*args)
+
+    def _release_due(self, now, force=False):
+        due = [r for r in self.releases if force or r[0] <= now]
+        if due:
+            self.releases = [r for r in self.releases if not (force or r[0] <= now)]
+            for _, call, args in due:
+                getattr(self.backend, call)(*args)
+
+    def _drain_overflow(self):
+        """队列空了：把排在后面的松开发掉（这时主循环的新动作也只会排进overflow）"""
+        with self.put_lock:
+            items, self.overflow = self.overflow, []
+        for queued, call, args in items:
+            start = self.clock()
+            self._execute(call, args)
+            self._record(call, start - queued)
+
+    def _run(self):
+        try:
+            while self.running or not self.queue.empty() or self.overflow:
+                if self.overflow and self.queue.empty():
+                    self._drain_overflow()
+                    continue
+                timeout = 0.1
+                if self.releases:
+                    timeout = max(min(r[0] for r in self.releases) - self.clock(), 0.0)
+                try:
+                    queued, call, args = self.queue.get(timeout=timeout)
+                except queue.Empty:
+                    queued = None
+                self._release_due(self.clock())
+                if queued is None:
+                    continue
+                start = self.clock()
+                self._execute(call, args)
+                self._record(call, start - queued)
+        except Exception as e:
+            self.error = e
+        finally:
+            # 退出时别把键留在按下的状态
+            for queued, call, args in self.overflow:
+                getattr(self.backend, call)(*args)
+            self._release_due(self.clock(), force=True)
+
+    def _record(self, call, delay):
+        if call not in self.delays:
+            self.delays[call] = deque(maxlen=self.keep)
+            self.counts[call] = 0
+        self.delays[call].append(delay)
+        self.counts[call] += 1
+
+    def queue_delay(self):
+        """每种动作的 次数、排队延迟p50/p95/最大（毫秒）"""
+        result = {}
+        for call, samples in list(self.delays.items()):
+            ms = np.array(samples) * 1000
+            p50, p95 = np.percentile(ms, (50, 95))
+            result[call] = {'count': self.counts[call], 'p50': float(p50), 'p95': float(p95), 'max': float(ms.max())}
+        return result
+
+    def report(self):
+        lines = [f"注入线程：合并移动 {self.merged} 次，丢弃 {self.dropped} 个，排队延迟："]
+        for call, st in self.queue_delay().items():
+            lines.append(f"  {call:10s} {st['count']:6d} 次  p50 {st['p50']:.3f}  p95 {st['p95']:.3f}  最大 {st['max']:.3f} ms")
+        if self.error is not None:
+            lines.append(f"  出错了: {self.error}")
+        return '\n'.join(lines)
+
+    def close(self, timeout=2):
+        """把队列里剩下的发完、按着的tap松开，再停线程"""
+        self.running = False
+        self.thread.join(timeout)
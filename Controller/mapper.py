@@ -0,0 +1,134 @@
+#手柄 → 键鼠的映射逻辑，从Ps5ControllerForSweetGF2.py里拆出来的
+#不依赖pygame和windll：joystick只要有get_axis(i)就行，键鼠事件交给输出引擎（output_engine.OutputEngine），
+#鼠标移动交给mover（注入线程或者直接是输入后端），所以用假手柄和只做记录的后端也能跑（replay.py）
+
+from motion import MotionIntegrator
+
+# -------------------------- PS5手柄按键映射表（预设常用键） --------------------------
+BUTTON_MAPPING = {
+    0: "left_click",  # ×键 → 鼠标左键
+    1: "right_click",  # ○键 → 鼠标右键
+    2: "keyboard_space",  # □键 → 隐藏对话框
+    3: "keyboard_ctrl",  # △键 → 按住文本跳过
+    9: "keyboard_f6",  # L1键 → 移动到上一个选项
+    10: "keyboard_f7",  # R1键 → 移动到下一个选项
+    15: "keyboard_enter",  # 触控板按下 → 键盘回车
+    6: "keyboard_esc",  #右上角按键 → esc
+    4: "keyboard_tab",  #左上角按键 → 显示后台日志
+    7: "keyboard_f8",  #左摇杆按下 → 跳过h场景
+    8: "keyboard_f12",  #右摇杆按下 → 最小化
+
+    # 方向键映射
+    11: "keyboard_f1",   # 上方向键 → 快速存档
+    12: "keyboard_f2",   # 下方向键 → 快速读档
+    13: "keyboard_f5",   # 左方向键 → 自动速度减慢
+    14: "keyboard_f4"    # 右方向键 → 自动速度加快
+}
+
+# 手柄键按住时怎么发，没列出来的是 "tap"（按下时点一下）
+#   "hold"   手柄键按多久，电脑键就按多久
+#   "repeat" 按住时先按下，过REPEAT_DELAY以后连发
+BUTTON_MODES = {
+    0: "hold",  # ×键 → 按住就是按住鼠标左键，可以拖动
+    1: "hold",  # ○键 → 鼠标右键
+    3: "hold",  # △键 → 按住Ctrl跳过文本，松开就停
+    9: "repeat",  # L1键 → 按住一直往上选
+    10: "repeat",  # R1键 → 按住一直往下选
+}
+
+
+def action_key(action):
+    """映射表里的动作 → 输出引擎的键名（"keyboard_f6" → "f6"，"left_click" → "mouse_left"）"""
+    if action.startswith("keyboard_"):
+        return action.split("_")[1]
+    return "mouse_" + action.split("_")[0]
+
+
+class ControllerMapper:
+    """
+    sticks_active()      有没有摇杆/扳机不在死区里
+    needs_tick()         摇杆推着，或者有键在连发、扳机在滚（主循环要不要按固定频率刷新）
+    tick(now)            固定频率的刷新：左摇杆→鼠标移动、右摇杆→方向键、扳机键→滚轮、连发
+    button(id, down)     手柄键按下/松开
+    参数的默认值和Ps5ControllerForSweetGF2.py里的配置一样，速度是像素/秒，滚轮是每秒滚多少。
+    """
+
+    def __init__(self, joystick, output, mover, base_speed=2000, max_speed=6000, dead_zone=0.1,
+                 smoothing=0.5, right_dead_zone=0.4, trigger_threshold=0.3, scroll_speed=200,
+                 arrow_repeat=True, button_mapping=BUTTON_MAPPING, button_modes=BUTTON_MODES):
+        self.joystick = joystick
+        self.output = output
+        self.mover = mover
+        self.dead_zone = dead_zone
+        self.right_dead_zone = right_dead_zone
+        self.trigger_threshold = trigger_threshold
+        self.scroll_speed = scroll_speed
+        self.arrow_repeat = arrow_repeat
+        self.button_mapping = button_mapping
+        self.button_modes = button_modes
+        # 左摇杆→鼠标移动：按实际经过的时间积分，小数像素攒到下一次
+        self.motion = MotionIntegrator(base_speed, max_speed, dead_zone, smoothing)
+
+    def left_stick(self, now):
+        """读取PS5左摇杆，控制鼠标移动"""
+        move_x, move_y = self.motion.step(self.joystick.get_axis(0), self.joystick.get_axis(1), now)
+        if move_x != 0 or move_y != 0:
+            # 直接移动，不用pyautogui的duration（它会在里面sleep分段移动）；平滑靠积分器里的平滑
+            self.mover.move_rel(move_x, move_y)
+
+    def right_stick(self):
+        """读取PS5右摇杆，模拟电脑方向键"""
+        dead_zone = self.right_dead_zone
+        right_x = self.joystick.get_axis(2)
+        right_y = self.joystick.get_axis(3)
+        right_x = 0 if abs(right_x) < dead_zone else right_x
+        right_y = 0 if abs(right_y) < dead_zone else right_y
+
+        # 根据摇杆方向决定哪几个方向键应该按着，输出引擎只发有变化的
+        self.output.hold('right_stick', 'up', right_y < -dead_zone, self.arrow_repeat)
+        self.output.hold('right_stick', 'down', right_y > dead_zone, self.arrow_repeat)
+        self.output.hold('right_stick', 'left', right_x < -dead_zone, self.arrow_repeat)
+        self.output.hold('right_stick', 'right', right_x > dead_zone, self.arrow_repeat)
+
+    def triggers(self):
+        """读取PS5扳机键（L2=滚轮上滚，R2=滚轮下滚）"""
+        l2_value = self.joystick.get_axis(2)
+        r2_value = self.joystick.get_axis(5)
+
+        # 按每秒滚的量设定，输出引擎攒够了再发；按深了翻倍
+        scroll_amount = 2 if l2_value > self.trigger_threshold * 1.5 else 1
+        if l2_value > self.trigger_threshold:
+            self.output.set_scroll(scroll_amount * self.scroll_speed)
+        elif r2_value > self.trigger_threshold:
+            self.output.set_scroll(-scroll_amount * self.scroll_speed)
+        else:
+            self.output.set_scroll(0)
+
+    def sticks_active(self):
+        get_axis = self.joystick.get_axis
+        left = abs(get_axis(0)) >= self.dead_zone or abs(get_axis(1)) >= self.dead_zone
+        right = abs(get_axis(2)) >= self.right_dead_zone or abs(get_axis(3)) >= self.right_dead_zone
+        trigger = get_axis(2) > self.trigger_threshold or get_axis(5) > self.trigger_threshold
+        return left or right or trigger
+
+    def needs_tick(self):
+        return self.sticks_active() or self.output.needs_tick()
+
+    def tick(self, now):
+        self.left_stick(now)
+        self.right_stick()
+        self.triggers()
+        # 连发和滚轮
+        self.output.tick(now)
+
+    def button(self, button_id, down):
+        """处理按键→键鼠操作（事件一到就处理）"""
+        if button_id not in self.button_mapping:
+            return
+        key = action_key(self.button_mapping[button_id])
+        mode = self.button_modes.get(button_id, "tap")
+        if mode == "tap":
+            if down:
+                self.output.tap(key)
+        else:
+            self.output.hold(("button", button_id), key, down, mode == "repeat")
@@ -0,0 +1,103 @@
+#左摇杆 → 鼠标移动的积分器：速度按 像素/秒 算，乘上两次刷新之间实际过了多久，
+#不再是"每一轮移动多少像素"，所以刷新快慢、偶尔卡一下都不会改变鼠标速度
+#  死区、平方加速曲线和原来一样；平滑也一样，只是按时间换算（刷新间隔等于reference时和原来完全相同）
+#  每次只发整数像素，小数部分留到下一次，不会被pyautogui.moveRel丢掉
+#不依赖pygame，喂一串假的摇杆数据就能测（python motion.py）
+
+import math
+
+
+class MotionIntegrator:
+    """
+    step(x, y, now)   x/y是摇杆原始读数（-1..1），now是时间（秒），返回这一次要移动的整数像素 (dx, dy)
+    reset()           摇杆回到死区里时清掉平滑值和攒着的小数
+
+    base_speed / max_speed  像素/秒，速度 = base + (max - base) * 偏离程度²
+    smoothing               每过reference秒，旧速度保留的比例（和原来的SMOOTHING_FACTOR一样）
+    max_dt                  两次刷新隔得再久也最多按这么长算，卡了很久以后鼠标不会一下子飞出去
+    """
+
+    def __init__(self, base_speed, max_speed, dead_zone=0.1, smoothing=0.5, reference=0.005, max_dt=0.1):
+        self.base_speed = base_speed
+        self.max_speed = max_speed
+        self.dead_zone = dead_zone
+        self.smoothing = smoothing
+        self.reference = reference
+        self.max_dt = max_dt
+        self.reset()
+
+    def reset(self):
+        self.vx, self.vy = 0.0, 0.0     # 平滑后的速度（像素/秒）
+        self.rx, self.ry = 0.0, 0.0     # 还没发出去的小数像素
+        self.last = None
+
+    def velocity(self, x, y):
+        """死区和加速曲线：摇杆读数 → 目标速度（像素/秒）"""
+        x = 0 if abs(x) < self.dead_zone else x
+        y = 0 if abs(y) < self.dead_zone else y
+        magnitude = math.sqrt(x ** 2 + y ** 2)
+        if magnitude == 0:
+            return 0.0, 0.0
+        # 平方曲线，更快达到高速
+        speed = self.base_speed + (self.max_speed - self.base_speed) * magnitude ** 2
+        return x / magnitude * speed, y / magnitude * speed
+
+    def step(self, x, y, now):
+        target_x, target_y = self.velocity(x, y)
+        if target_x == 0 and target_y == 0:
+            self.reset()
+            return 0, 0
+
+        # 刚推出去的第一次没有上一次的时间，只记下时间，从这一刻开始积分
+        dt = 0.0 if self.last is None else min(max(now - self.last, 0.0), self.max_dt)
+        first = self.last is None
+        self.last = now
+        # 原来每轮 新 = 旧*s + 目标*(1-s)；换成按时间：过了dt就保留 s^(dt/reference)
+        keep = self.smoothing ** (dt / self.reference) if not first else self.smoothing
+        self.vx = self.vx * keep + target_x * (1 - keep)
+        self.vy = self.vy * keep + target_y * (1 - keep)
+
+        self.rx += self.vx * dt
+        self.ry += self.vy * dt
+        dx, dy = int(self.rx), int(self.ry)     # 往0取整，剩下的小数留着（正负都对）
+        self.rx -= dx
+        self.ry -= dy
+        return dx, dy
+
+
+def simulate(integrator, trace, interval, duration):
+    """
+    按固定间隔采样一段假的摇杆轨迹：trace(t) -> (x, y)，返回总共移动了多少 (dx, dy) 和发了几次移动
+    """
+    total_x = total_y = moves = 0
+    steps = int(round(duration / interval))
+    for i in range(steps + 1):
+        t = i * interval
+        dx, dy = integrator.step(*trace(t), t)
+        if dx or dy:
+            total_x += dx
+            total_y += dy
+            moves += 1
+    return total_x, total_y, moves
+
+
+def main():
+    """同一段轨迹用不同的刷新频率跑一遍，鼠标走的距离应该基本一样"""
+    # 原脚本是每5ms走10~30像素，换成每秒
+    base, top = 10 / 0.005, 30 / 0.005
+    traces = {
+        '推满右': lambda t: (1.0, 0.0),
+        '推一半右下': lambda t: (0.5, 0.5),
+        '轻推左': lambda t: (-0.2, 0.0),
+        '来回摆': lambda t: (math.sin(2 * math.pi * t), 0.3),
+    }
+    for name, trace in traces.items():
+        print(name)
+        for hz in (60, 125, 200, 500, 1000):
+            integrator = MotionIntegrator(base, top)
+            dx, dy, moves = simulate(integrator, trace, 1 / hz, 1.0)
+            print(f"  {hz:5d} Hz: 1秒移动 ({dx:6d}, {dy:6d}) 像素，发了 {moves} 次")
+
+
+if __name__ == '__main__':
+    main()
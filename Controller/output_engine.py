@@ -0,0 +1,115 @@
+#输出引擎：记住每个虚拟键/鼠标键"现在应该是按着还是松开"，只在状态变化时才发键鼠事件
+#  hold   手柄键按多久，电脑键就按多久（△按住Ctrl跳过文本）
+#  repeat 按住时先按下，过repeat_delay以后每repeat_interval再发一次按下（和键盘长按连发一样）
+#  tap    按下时点一下
+#滚轮按"每秒滚多少"设定，攒够整数再发，不再每一轮都发一次
+#键名：键盘键用pyautogui的写法（'ctrl'、'up'、'f6'），鼠标键是 'mouse_left' / 'mouse_right' / 'mouse_middle'
+
+import time
+
+MOUSE_PREFIX = 'mouse_'
+
+
+class OutputEngine:
+    """
+    hold(source, key, on, repeat=False)
+        source（比如 'right_stick'、('button', 3)）要求key按着/松开；
+        好几个来源可以同时要求按着同一个键，全都松开了才真正松开
+    tap(key)             点一下
+    set_scroll(rate)     每秒滚多少（正数往上），0是不滚
+    tick(now)            连发和滚轮靠它推进，needs_tick()为True时要定时调用
+    release_all()        退出前把按着的都松开
+    """
+
+    def __init__(self, backend, repeat_delay=0.4, repeat_interval=0.05, scroll_interval=0.05,
+                 clock=time.perf_counter):
+        self.backend = backend
+        self.repeat_delay = repeat_delay
+        self.repeat_interval = repeat_interval
+        self.scroll_interval = scroll_interval   # 滚轮最快多久发一次
+        self.clock = clock
+        self.sources = {}       # 键 -> 要求它按着的来源集合
+        self.held = set()       # 真正按下了的键
+        self.repeating = {}     # 连发的键 -> 下一次连发的时间
+        self.scroll_rate = 0.0
+        self.scroll_pending = 0.0
+        self.last_scroll = None
+        self.emitted = 0        # 实际发出的事件数
+        self.requests = 0       # 收到的请求数（hold/tap/滚轮的每一轮）
+
+    def _down(self, key):
+        if key.startswith(MOUSE_PREFIX):
+            self.backend.mouse_down(key[len(MOUSE_PREFIX):])
+        else:
+            self.backend.key_down(key)
+        self.emitted += 1
+
+    def _up(self, key):
+        if key.startswith(MOUSE_PREFIX):
+            self.backend.mouse_up(key[len(MOUSE_PREFIX):])
+        else:
+            self.backend.key_up(key)
+        self.emitted += 1
+
+    def hold(self, source, key, on, repeat=False):
+        self.requests += 1
+        sources = self.sources.setdefault(key, set())
+        if on:
+            sources.add(source)
+        else:
+            sources.discard(source)
+
+        if sources and key not in self.held:
+            self._down(key)
+            self.held.add(key)
+            if repeat and not key.startswith(MOUSE_PREFIX):
+                self.repeating[key] = self.clock() + self.repeat_delay
+        elif not sources and key in self.held:
+            self._up(key)
+            self.held.discard(key)
+            self.repeating.pop(key, None)
+
+    def tap(self, key):
+        self.requests += 1
+        if key.startswith(MOUSE_PREFIX):
+            self.backend.click(button=key[len(MOUSE_PREFIX):])
+        else:
+            self.backend.press(key)
+        self.emitted += 1
+
+    def set_scroll(self, rate):
+        self.requests += 1
+        if rate and not self.scroll_rate:
+            self.last_scroll = self.clock()
+            self.scroll_pending = 0.0
+        self.scroll_rate = rate
+
+    def needs_tick(self):
+        return bool(self.repeating) or bool(self.scroll_rate)
+
+    def tick(self, now=None):
+        now = self.clock() if now is None else now
+        for key, due in list(self.repeating.items()):
+            if now >= due:
+                self.backend.key_down(key)      # 连发：只重复按下，和键盘长按一样
+                self.emitted += 1
+                self.repeating[key] = max(due + self.repeat_interval, now)
+        if self.scroll_rate and now - self.last_scroll >= self.scroll_interval:
+            self.scroll_pending += self.scroll_rate * (now - self.last_scroll)
+            self.last_scroll = now
+            clicks = int(self.scroll_pending)
+            if clicks:
+                self.backend.scroll(clicks)
+                self.emitted += 1
+                self.scroll_pending -= clicks
+
+    def release_all(self):
+        for key in list(self.held):
+            self._up(key)
+        self.held.clear()
+        self.sources.clear()
+        self.repeating.clear()
+        self.scroll_rate = 0.0
+
+    def report(self):
+        return f"输出引擎：收到 {self.requests} 次请求，实际发出 {self.emitted} 个事件，现在按着 {sorted(self.held)}"
@@ -0,0 +1,343 @@
+#手柄映射的回放测速：不用真手柄，把录下来的（或者生成的）摇杆/按键序列喂给同一套映射逻辑（mapper.py），
+#键鼠换成只做记录的假后端（opencv_redbag/input_backend.MockBackend），linux无头也能跑
+#  python replay.py --generate mixed --duration 20
+#  python replay.py trace.jsonl --interval 0.005 --dead-zone 0.15 --save a.json
+#  python replay.py trace.jsonl --realtime          # 按真实时间跑，经过注入线程，延迟里算上排队
+#默认用虚拟时间：不等待，一下子跑完，延迟是主循环调度造成的（刷新间隔、事件什么时候被处理）
+#报告：从手柄输入到发出对应键鼠事件的延迟、每秒发出多少事件、每模拟一秒花了多少CPU时间
+#序列文件每行一个json：{"t": 秒, "axis": 轴号, "value": 值} 或 {"t": 秒, "button": 键号, "down": true/false}
+
+import argparse
+import json
+import math
+import os
+import sys
+import time
+
+import numpy as np
+
+# 加在最后：opencv_redbag里也有replay.py，不能让它挡住这个目录里的同名模块
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'opencv_redbag'))
+from input_backend import MockBackend
+
+from event_loop import EventLoop, wait_ms
+from injector import InjectionWorker
+from mapper import BUTTON_MAPPING, ControllerMapper
+from output_engine import OutputEngine
+
+AXES = 6
+# 某个输入变化以后"应该"出现的键鼠事件，超过这么久还没出现就算没反应
+MATCH_WINDOW = 1.0
+
+
+class VirtualJoystick:
+    """假手柄：和pygame的Joystick一样用get_axis读"""
+
+    def __init__(self, axes=AXES):
+        self.axes = [0.0] * axes
+
+    def get_axis(self, i):
+        return self.axes[i]
+
+    def get_numaxes(self):
+        return len(self.axes)
+
+
+class TraceRecorder:
+    """录手柄输入：Ps5ControllerForSweetGF2.py里配了RECORD_TRACE就把收到的pygame事件原样记下来"""
+
+    def __init__(self, path, clock=time.perf_counter):
+        self.file = open(path, 'w', encoding='utf-8')
+        self.clock = clock
+        self.start = clock()
+
+    def record(self, event):
+        import pygame
+        t = round(self.clock() - self.start, 6)
+        if event.type == pygame.JOYAXISMOTION:
+            item = {'t': t, 'axis': event.axis, 'value': round(event.value, 4)}
+        elif event.type in (pygame.JOYBUTTONDOWN, pygame.JOYBUTTONUP):
+            item = {'t': t, 'button': event.button, 'down': event.type == pygame.JOYBUTTONDOWN}
+        else:
+            return
+        self.file.write(json.dumps(item) + '\n')
+
+    def close(self):
+        self.file.close()
+
+
+def load_trace(path):
+    with open(path, encoding='utf-8') as f:
+        trace = [json.loads(line) for line in f if line.strip()]
+    return sorted(trace, key=lambda item: item['t'])
+
+
+def save_trace(trace, path):
+    with open(path, 'w', encoding='utf-8') as f:
+        for item in trace:
+            f.write(json.dumps(item) + '\n')
+
+
+def generate(kind='mixed', duration=10.0, rate=250, seed=0):
+    """
+    生成一段假的手柄输入，轴按rate Hz报告（DualSense蓝牙大约250Hz），值没变的不报（和pygame一样）
+      stick    左摇杆：推一会儿画圈、推着不动、松开停一会儿，反复
+      buttons  各种键随机按下松开（点一下、按住、长按连发）
+      mixed    上面两种加上右摇杆方向键和扳机滚轮
+    """
+    rng = np.random.default_rng(seed)
+    trace = []
+    last = [0.0] * AXES
+
+    def axis(t, i, value):
+        value = round(float(np.clip(value, -1, 1)), 4)
+        if value != last[i]:
+            last[i] = value
+            trace.append({'t': round(t, 6), 'axis': i, 'value': value})
+
+    steps = int(duration * rate)
+    for k in range(steps):
+        t = k / rate
+        phase = t % 4.0
+        if kind in ('stick', 'mixed'):
+            # 前2秒推着画圈（幅度慢慢变大），再推着不动0.5秒，后1.5秒松开
+            if phase < 2.0:
+                r = 0.3 + 0.7 * phase / 2.0
+                axis(t, 0, r * math.cos(2 * math.pi * t * 0.5))
+                axis(t, 1, r * math.sin(2 * math.pi * t * 0.5))
+            elif phase < 2.5:
+                pass    # 推着不动时手柄不发事件，鼠标还得一直动，全靠主循环自己按时刷新
+            else:
+                axis(t, 0, 0.0)
+                axis(t, 1, 0.0)
+        if kind == 'mixed':
+            # 右摇杆：每4秒里 1~1.8秒往上推、2.5~2.8秒往右推；R2：3~3.5秒按下
+            axis(t, 3, -0.9 if 1.0 <= phase < 1.8 else 0.0)
+            axis(t, 2, 0.8 if 2.5 <= phase < 2.8 else 0.0)
+            axis(t, 5, 0.8 if 3.0 <= phase < 3.5 else -1.0)
+
+    if kind in ('buttons', 'mixed'):
+        buttons = sorted(BUTTON_MAPPING)
+        t = 0.1
+        while t < duration - 1.0:
+            button = int(rng.choice(buttons))
+            hold = float(rng.choice([0.05, 0.2, 0.8]))
+            trace.append({'t': round(t, 6), 'button': button, 'down': True})
+            trace.append({'t': round(t + hold, 6), 'button': button, 'down': False})
+            t += hold + float(rng.uniform(0.1, 0.6))
+    return sorted(trace, key=lambda item: item['t'])
+
+
+class TracePlayer:
+    """
+    主循环的wait：按时间把序列里的输入放进假手柄（轴直接改值，按键变成事件返回），
+    sim=True时用虚拟时间，等待就是把时间直接拨过去；否则真的sleep到下一个输入。
+    等多久和pygame_wait一样按wait_ms换算，也照pygame的规矩：不等（None）只取已经到了的输入，
+    wait(0)一直等到下一个输入，这样主循环的超时算错了回放里也看得出来（刷新停了、延迟变大）。
+    """
+
+    def __init__(self, trace, joystick, sim=True):
+        self.trace = trace
+        self.joystick = joystick
+        self.sim = sim
+        self.i = 0
+        self.t = 0.0
+        self.start = time.perf_counter()
+        self.inputs = []        # 已经放进去的输入
+
+    def now(self):
+        return self.t if self.sim else time.perf_counter() - self.start
+
+    def wait(self, timeout):
+        now = self.now()
+        ms = wait_ms(timeout)
+        if ms is None:
+            end = now
+        elif ms == 0:
+            end = math.inf
+        else:
+            end = now + ms / 1000
+        if self.i < len(self.trace) and self.trace[self.i]['t'] <= end:
+            due = max(self.trace[self.i]['t'], now)
+        else:
+            due = end if end != math.inf else now   # 序列放完了，再等也不会有输入
+        if self.sim:
+            self.t = due
+        elif due > now:
+            time.sleep(due - now)
+        now = self.now()
+
+        events = []
+        while self.i < len(self.trace) and self.trace[self.i]['t'] <= now:
+            item = self.trace[self.i]
+            self.i += 1
+            if 'axis' in item:
+                self.joystick.axes[item['axis']] = item['value']
+            events.append(item)
+            self.inputs.append(item)
+        return events
+
+
+def expected_edges(inputs, mapper):
+    """
+    从输入序列里找出"应该有键鼠事件"的时刻，返回 [(时间, 这时候应该出现的调用名集合), ...]
+    按键按下/松开、左摇杆从死区推出去（开始移动）、右摇杆方向变化、扳机开始滚
+    时间用序列里输入发生的时间，实时回放时sleep醒晚了也算在延迟里
+    """
+    joystick = VirtualJoystick()
+    get_axis = joystick.get_axis
+    dz = mapper.right_dead_zone
+    left = scrolling = False
+    arrows = ()
+    edges = []
+    for item in inputs:
+        t = item['t']
+        if 'button' in item:
+            if item['button'] in mapper.button_mapping:
+                mode = mapper.button_modes.get(item['button'], 'tap')
+                if item['down'] or mode != 'tap':
+                    edges.append((t, {'key_down', 'key_up', 'press', 'click', 'mouse_down', 'mouse_up'}))
+            continue
+        joystick.axes[item['axis']] = item['value']
+        now_left = abs(get_axis(0)) >= mapper.dead_zone or abs(get_axis(1)) >= mapper.dead_zone
+        if now_left and not left:
+            edges.append((t, {'move_rel'}))
+        left = now_left
+        now_arrows = (get_axis(3) < -dz, get_axis(3) > dz, get_axis(2) < -dz, get_axis(2) > dz)
+        if now_arrows != arrows and (any(now_arrows) or any(arrows)):
+            edges.append((t, {'key_down', 'key_up'}))
+        arrows = now_arrows
+        now_scrolling = get_axis(2) > mapper.trigger_threshold or get_axis(5) > mapper.trigger_threshold
+        if now_scrolling and not scrolling:
+            edges.append((t, {'scroll'}))
+        scrolling = now_scrolling
+    return edges
+
+
+def match_latency(edges, emitted):
+    """每个输入时刻之后第一个对得上的键鼠事件隔了多久；返回 (延迟列表, 没反应的个数)"""
+    times = np.array([t for t, _, _ in emitted])
+    latencies, missed = [], 0
+    for t, calls in edges:
+        j = int(np.searchsorted(times, t - 1e-9))
+        while j < len(emitted) and emitted[j][0] - t <= MATCH_WINDOW:
+            if emitted[j][1] in calls:
+                latencies.append(emitted[j][0] - t)
+                break
+            j += 1
+        else:
+            missed += 1
+    return latencies, missed
+
+
+def percentiles(samples):
+    if not samples:
+        return {'count': 0, 'p50': 0.0, 'p95': 0.0, 'p99': 0.0, 'max': 0.0}
+    ms = np.array(samples) * 1000
+    p50, p95, p99 = np.percentile(ms, (50, 95, 99))
+    return {'count': len(samples), 'p50': float(p50), 'p95': float(p95), 'p99': float(p99), 'max': float(ms.max())}
+
+
+def replay(trace, interval=0.008, realtime=False, tap_time=0.03, **mapper_args):
+    """
+    把trace回放一遍，mapper_args是ControllerMapper的参数（dead_zone、smoothing……）
+    返回结果字典（可以直接存成json）
+    """
+    joystick = VirtualJoystick()
+    player = TracePlayer(trace, joystick, sim=not realtime)
+    backend = MockBackend(clock=player.now)
+    if realtime:
+        injector = InjectionWorker(backend, tap_time, clock=player.now)
+        sink = injector
+    else:
+        injector = None
+        sink = backend
+    output = OutputEngine(sink, clock=player.now)
+    mapper = ControllerMapper(joystick, output, sink, **mapper_args)
+
+    def on_events(events):
+        for item in events:
+            if 'button' in item:
+                mapper.button(item['button'], item['down'])
+
+    loop = EventLoop(player.wait, on_events, mapper.needs_tick, mapper.tick, interval, clock=player.now)
+    duration = (trace[-1]['t'] if trace else 0.0) + 0.5
+    cpu = time.process_time()
+    wall = time.perf_counter()
+    loop.run(stop=lambda: player.now() >= duration)
+    output.release_all()
+    if injector is not None:
+        injector.close()
+    cpu = time.process_time() - cpu
+    wall = time.perf_counter() - wall
+
+    emitted = backend.events
+    latencies, missed = match_latency(expected_edges(player.inputs, mapper), emitted)
+    counts = {}
+    for _, call, _ in emitted:
+        counts[call] = counts.get(call, 0) + 1
+    return {
+        'mode': 'realtime' if realtime else 'simulated',
+        'interval': interval,
+        'settings': mapper_args,
+        'duration': duration,
+        'inputs': len(player.inputs),
+        'events': len(emitted),
+        'events_per_s': len(emitted) / duration,
+        'calls': counts,
+        'latency_ms': percentiles(latencies),
+        'missed': missed,
+        'cpu_ms_per_s': cpu * 1000 / duration,
+        'wall_s': wall,
+        'pointer': list(backend.pointer),
+        'loop': {'wakeups': loop.wakeups, 'ticks': loop.ticks},
+        'queue_delay_ms': injector.queue_delay() if injector is not None else None,
+    }
+
+
+def print_result(result):
+    lat = result['latency_ms']
+    print(f"{result['mode']}：回放 {result['duration']:.1f}s，输入 {result['inputs']} 个，"
+          f"刷新间隔 {result['interval'] * 1000:.1f}ms，用时 {result['wall_s']:.2f}s")
+    print(f"  输入→键鼠事件延迟：{lat['count']} 次  p50 {lat['p50']:.2f}  p95 {lat['p95']:.2f}  "
+          f"p99 {lat['p99']:.2f}  最大 {lat['max']:.2f} ms，没反应 {result['missed']} 次")
+    print(f"  发出 {result['events']} 个事件（{result['events_per_s']:.1f}/s）：" +
+          ', '.join(f"{call} {n}" for call, n in sorted(result['calls'].items())))
+    print(f"  CPU {result['cpu_ms_per_s']:.2f} ms / 模拟1秒；主循环醒来 {result['loop']['wakeups']} 次，"
+          f"刷新 {result['loop']['ticks']} 次；鼠标最后在 {tuple(result['pointer'])}")
+    if result['queue_delay_ms']:
+        for call, st in result['queue_delay_ms'].items():
+            print(f"  排队 {call:10s} p50 {st['p50']:.3f}  p95 {st['p95']:.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='手柄映射回放测速（不需要手柄）')
+    parser.add_argument('trace', nargs='?', help='录下来的输入序列（jsonl），不给就用--generate生成')
+    parser.add_argument('--generate', default='mixed', choices=('stick', 'buttons', 'mixed'))
+    parser.add_argument('--duration', type=float, default=20, help='生成的序列多长（秒）')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--write-trace', help='把生成的序列存下来')
+    parser.add_argument('--realtime', action='store_true', help='按真实时间跑，经过注入线程')
+    parser.add_argument('--interval', type=float, default=0.008, help='摇杆推出去时的刷新间隔')
+    parser.add_argument('--dead-zone', type=float, default=0.1)
+    parser.add_argument('--right-dead-zone', type=float, default=0.4)
+    parser.add_argument('--smoothing', type=float, default=0.5)
+    parser.add_argument('--save', help='结果存成json，方便比较不同参数')
+    args = parser.parse_args()
+
+    if args.trace:
+        trace = load_trace(args.trace)
+    else:
+        trace = generate(args.generate, args.duration, seed=args.seed)
+        if args.write_trace:
+            save_trace(trace, args.write_trace)
+    result = replay(trace, args.interval, args.realtime, dead_zone=args.dead_zone,
+                    right_dead_zone=args.right_dead_zone, smoothing=args.smoothing)
+    print_result(result)
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,195 @@
+#convert.py的批量版：一个文件夹（或通配符）的图片 × 几组厚度参数，分给多个进程转成STL
+#输出文件名是 图片名_最小厚度-最大厚度-基座高度.stl（a.png和a.bmp、不同文件夹里的同名图片会带上扩展名/路径的短哈希）；
+#缓存清单记下每个输出用的图片内容sha256和参数，
+#图片内容和参数都没变、STL也还在的直接跳过；最后打印每个文件的用时
+#用法：python batch.py 图片文件夹或通配符... -p 1.0,2.5,0 -p 0.8,3,0.5 [-o 输出文件夹] [-j 进程数] [--max-error 0.05] [--force]
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from convert import image_to_stl
+
+IMAGE_EXTS = ('.png', '.jpg', '.jpeg', '.bmp', '.gif', '.tif', '.tiff', '.webp')
+MANIFEST_NAME = 'img2stl_cache.json'
+DEFAULT_PRESET = (1.0, 2.5, 0.0)   # 和convert.py里的默认配置一样
+
+
+def list_images(patterns):
+    """文件夹、单个文件或通配符 → 去重排好序的图片路径"""
+    paths = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            found = [os.path.join(pattern, name) for name in os.listdir(pattern)]
+        else:
+            found = glob.glob(pattern)
+        paths += [p for p in found if os.path.isfile(p) and p.lower().endswith(IMAGE_EXTS)]
+    return sorted({os.path.abspath(p) for p in paths})
+
+
+def parse_preset(text):
+    """'1.0,2.5,0' → (最小厚度, 最大厚度, 基座高度)"""
+    try:
+        min_thickness, max_thickness, base_height = (float(v) for v in text.split(','))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"参数组要写成 最小厚度,最大厚度,基座高度：{text}")
+    return min_thickness, max_thickness, base_height
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def output_stems(paths):
+    """
+    每张图输出文件名用的前缀：一般就是图片名去掉扩展名；
+    a.png和a.bmp会撞，撞了的带上扩展名（a_png、a_bmp），还撞（不同文件夹里的同名图片）就再带上路径的短哈希
+    """
+    def clashes(stems):
+        counts = Counter(stems.values())
+        return [p for p, stem in stems.items() if counts[stem] > 1]
+
+    stems = {p: os.path.splitext(os.path.basename(p))[0] for p in paths}
+    for p in clashes(stems):
+        stem, ext = os.path.splitext(os.path.basename(p))
+        stems[p] = f"{stem}_{ext[1:].lower()}"
+    for p in clashes(stems):
+        stems[p] += '_' + hashlib.sha256(os.path.abspath(p).encode('utf-8')).hexdigest()[:8]
+    return stems
+
+
+def output_name(stem, preset):
+    return f"{stem}_{preset[0]:g}-{preset[1]:g}-{preset[2]:g}.stl"
+
+
+def load_manifest(out_dir):
+    try:
+        with open(os.path.join(out_dir, MANIFEST_NAME), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_manifest(out_dir, manifest):
+    tmp = os.path.join(out_dir, MANIFEST_NAME + '.tmp')
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1)
+    os.replace(tmp, os.path.join(out_dir, MANIFEST_NAME))
+
+
+def _quiet(message):
+    pass
+
+
+def convert_one(path, output, settings):
+    """在子进程里转一张图，返回 (三角形数, 用时秒)"""
+    start = time.perf_counter()
+    triangles = image_to_stl(path, output, settings['min_thickness'], settings['max_thickness'],
+                             settings['base_height'], max_error=settings['max_error'], log=_quiet)
+    return triangles, time.perf_counter() - start
+
+
+def run(paths, presets, out_dir, jobs=None, max_error=None, force=False):
+    """
+    转换所有 图片 × 参数组，返回每个输出的结果行：
+    {'file', 'output', 'status'（done/cached/failed）, 'triangles', 'seconds', 'error'}
+    """
+    # 同一组参数写了两次（1,2.5,0 和 1,2.50,0）只做一次
+    presets = list(dict.fromkeys(presets))
+    stems = output_stems(paths)
+    outputs = {(path, preset): output_name(stems[path], preset) for path in paths for preset in presets}
+    if len(set(outputs.values())) != len(outputs):
+        # 只剩参数的有效数字超过:g显示的位数这一种情况
+        clash = [name for name, count in Counter(outputs.values()).items() if count > 1]
+        raise ValueError(f"几组参数的输出文件名相同：{', '.join(clash)}")
+
+    os.makedirs(out_dir, exist_ok=True)
+    manifest = {} if force else load_manifest(out_dir)
+    hashes = {path: file_hash(path) for path in paths}
+
+    rows, todo = {}, []
+    for path in paths:
+        for preset in presets:
+            output = outputs[path, preset]
+            settings = {'min_thickness': preset[0], 'max_thickness': preset[1], 'base_height': preset[2],
+                        'max_error': max_error}
+            entry = manifest.get(output)
+            if (entry is not None and entry['image_sha256'] == hashes[path] and entry['settings'] == settings
+                    and os.path.exists(os.path.join(out_dir, output))):
+                rows[output] = {'file': os.path.basename(path), 'output': output, 'status': 'cached',
+                                'triangles': entry['triangles'], 'seconds': 0.0, 'error': ''}
+            else:
+                todo.append((path, output, settings))
+
+    if todo:
+        with ProcessPoolExecutor(jobs) as pool:
+            futures = {pool.submit(convert_one, path, os.path.join(out_dir, output), settings): (path, output, settings)
+                       for path, output, settings in todo}
+            for future in as_completed(futures):
+                path, output, settings = futures[future]
+                row = {'file': os.path.basename(path), 'output': output, 'triangles': 0, 'seconds': 0.0, 'error': ''}
+                try:
+                    row['triangles'], row['seconds'] = future.result()
+                except Exception as e:
+                    row.update(status='failed', error=str(e))
+                    manifest.pop(output, None)
+                    print(f"{output}: {e}")
+                else:
+                    row['status'] = 'done'
+                    manifest[output] = {'image': os.path.abspath(path), 'image_sha256': hashes[path],
+                                        'settings': settings, 'triangles': row['triangles'],
+                                        'seconds': round(row['seconds'], 3)}
+                    print(f"{output}: {row['triangles']} 个三角形 ({row['seconds']:.2f}s)")
+                rows[output] = row
+        save_manifest(out_dir, manifest)
+
+    # 按 图片 × 参数组 的顺序返回
+    return [rows[outputs[path, preset]] for path in paths for preset in presets]
+
+
+def print_summary(rows, elapsed):
+    print(f"{'输出':40s} {'状态':6s} {'三角形':>12s} {'用时':>8s}")
+    for row in rows:
+        print(f"{row['output']:40s} {row['status']:6s} {row['triangles']:12d} {row['seconds']:7.2f}s")
+    counts = {status: sum(row['status'] == status for row in rows) for status in ('done', 'cached', 'failed')}
+    busy = sum(row['seconds'] for row in rows)
+    print(f"共 {len(rows)} 个：生成 {counts['done']} 个，跳过 {counts['cached']} 个（没有变化），失败 {counts['failed']} 个；"
+          f"用时 {elapsed:.2f}s（各文件合计 {busy:.2f}s）")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='批量把图片转成STL浮雕，没变的跳过')
+    parser.add_argument('inputs', nargs='+', help='图片文件夹、图片文件或通配符（如 "imgs/*.png"）')
+    parser.add_argument('-p', '--preset', action='append', type=parse_preset,
+                        help='一组参数 最小厚度,最大厚度,基座高度（毫米），可以给多次；默认 1,2.5,0')
+    parser.add_argument('-o', '--out', default='stl_out', help='输出文件夹（缓存清单也在这里）')
+    parser.add_argument('-j', '--jobs', type=int, default=None, help='进程数，默认等于CPU核数')
+    parser.add_argument('--max-error', type=float, default=None, help='自适应简化的最大高度误差（毫米）')
+    parser.add_argument('--force', action='store_true', help='忽略缓存，全部重新生成')
+    args = parser.parse_args()
+
+    paths = list_images(args.inputs)
+    if not paths:
+        print('没有找到图片', ' '.join(args.inputs))
+        return
+    presets = args.preset or [DEFAULT_PRESET]
+    start = time.perf_counter()
+    try:
+        rows = run(paths, presets, args.out, args.jobs, args.max_error, args.force)
+    except ValueError as e:
+        print(e)
+        return
+    print_summary(rows, time.perf_counter() - start)
+
+
+if __name__ == '__main__':
+    main()
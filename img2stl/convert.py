@@ -1,8 +1,473 @@
 from PIL import Image
+import os
+import struct
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
 import numpy as np
 from stl import mesh
 
-def create_stl_from_image(image_path, output_filename, min_thickness=1.0, max_thickness=3.0, base_height=0.5):
+class DepthMap:
+    """
+    灰度像素 → 厚度（毫米）。用切片取行时才算那几行，流式导出时不用把整张float64的深度图放进内存；
+    depth_map[:] 就是整张深度图。
+    """
+
+    def __init__(self, pixels, min_thickness, max_thickness):
+        self.pixels = pixels
+        self.min_thickness = min_thickness
+        self.max_thickness = max_thickness
+        self.shape = pixels.shape
+
+    def __getitem__(self, rows):
+        # 将灰度值映射到厚度
+        inverted_pixels = 255 - self.pixels[rows]
+        normalized_height = inverted_pixels / 255.0
+        return self.min_thickness + (self.max_thickness - self.min_thickness) * normalized_height
+
+def vertex_grid(depth_map, base_height, start=0, stop=None):
+    """
+    一次算出顶点网格第start..stop行（含stop，默认是整张图的 0..height）的 [x, height - y, z]。
+    顶点高度是它周围（最多）四个像素深度的平均：四周补一圈0，做2x2求和再除以实际的像素个数，
+    边上是2个、角上是1个。加法顺序和np.mean对2x2切片逐个累加的顺序一样，结果逐位相同。
+    depth_map可以是数组，也可以是DepthMap（只会取用到的那几行）。
+    """
+    height, width = depth_map.shape
+    stop = height if stop is None else stop
+    # 第y行顶点用到深度图的第y-1和第y行，图像外面的算0
+    lo, hi = max(start - 1, 0), min(stop + 1, height)
+    padded = np.zeros((stop - start + 2, width + 2))
+    padded[lo - start + 1:hi - start + 1, 1:-1] = depth_map[lo:hi]
+    total = ((padded[:-1, :-1] + padded[:-1, 1:]) + padded[1:, :-1]) + padded[1:, 1:]
+
+    # 每个顶点周围实际有几个像素
+    ys = np.arange(start, stop + 1)
+    rows = np.where((ys == 0) | (ys == height), 1, 2)
+    cols = np.full(width + 1, 2)
+    cols[[0, -1]] = 1
+    count = rows[:, None] * cols[None, :]
+
+    vertices = np.empty((stop - start + 1, width + 1, 3))
+    xs, ys = np.meshgrid(np.arange(width + 1), ys)
+    vertices[..., 0] = xs
+    # Y坐标使用 (height - y) 来修正图像上下颠倒的问题
+    vertices[..., 1] = height - ys
+    vertices[..., 2] = total / count + base_height
+    return vertices
+
+def face_count(width, height):
+    """三角形总数：顶面每个像素2个，基座2个，四面侧墙每格2个"""
+    return 2 * width * height + 2 + 4 * width + 4 * height
+
+def fill_faces(vectors, vertices):
+    """
+    把顶面、基座、侧墙的三角形按索引一次写进vectors（形状 (face_count, 3, 3)），
+    顺序和原来逐个append的一样：顶面逐像素，基座，上下两边的墙交替，左右两边的墙交替。
+    """
+    n_top = fill_top(vectors, vertices)
+    fill_sides(vectors[n_top:], vertices[0], vertices[-1], vertices[:, 0], vertices[:, -1])
+
+def fill_top(vectors, vertices):
+    """顶面：vertices是连续的几行顶点，写进vectors开头，返回写了几个三角形"""
+    rows, width = vertices.shape[0] - 1, vertices.shape[1] - 1
+    n_top = 2 * width * rows
+
+    # 每个像素的四个顶点 v1(左上) v2(右上) v3(左下) v4(右下)，两个三角形 [v1, v3, v2] [v2, v3, v4]
+    top = vectors[:n_top].reshape(rows, width, 2, 3, 3)
+    v1, v2 = vertices[:-1, :-1], vertices[:-1, 1:]
+    v3, v4 = vertices[1:, :-1], vertices[1:, 1:]
+    top[:, :, 0, 0], top[:, :, 0, 1], top[:, :, 0, 2] = v1, v3, v2
+    top[:, :, 1, 0], top[:, :, 1, 1], top[:, :, 1, 2] = v2, v3, v4
+    return n_top
+
+def fill_sides(vectors, top_row, bottom_row, left_col, right_col):
+    """基座和四面侧墙，只用到顶点网格最外面一圈：第一行、最后一行、第一列、最后一列"""
+    width, height = len(top_row) - 1, len(left_col) - 1
+
+    # 基座底部的两个三角形
+    base = np.array([[0, 0, 0], [width, 0, 0], [0, height, 0], [width, height, 0]])
+    vectors[0] = base[[0, 1, 2]]
+    vectors[1] = base[[2, 1, 3]]
+
+    # 侧面墙体：顶部边缘和它压到z=0的底部边缘
+    def edge(top_edge):
+        bottom_edge = top_edge.copy()
+        bottom_edge[:, 2] = 0
+        return top_edge[:-1], top_edge[1:], bottom_edge[:-1], bottom_edge[1:]
+
+    start = 2
+    walls = vectors[start:start + 4 * width].reshape(width, 4, 3, 3)
+    t0, t1, b0, b1 = edge(top_row)          # 图像顶部 (y=height)
+    walls[:, 0, 0], walls[:, 0, 1], walls[:, 0, 2] = t0, b0, t1
+    walls[:, 1, 0], walls[:, 1, 1], walls[:, 1, 2] = b0, b1, t1
+    t0, t1, b0, b1 = edge(bottom_row)       # 图像底部 (y=0)
+    walls[:, 2, 0], walls[:, 2, 1], walls[:, 2, 2] = t0, t1, b0
+    walls[:, 3, 0], walls[:, 3, 1], walls[:, 3, 2] = b0, t1, b1
+
+    start += 4 * width
+    walls = vectors[start:start + 4 * height].reshape(height, 4, 3, 3)
+    t0, t1, b0, b1 = edge(left_col)         # 图像左侧
+    walls[:, 0, 0], walls[:, 0, 1], walls[:, 0, 2] = t0, t1, b0
+    walls[:, 1, 0], walls[:, 1, 1], walls[:, 1, 2] = b0, t1, b1
+    t0, t1, b0, b1 = edge(right_col)        # 图像右侧
+    walls[:, 2, 0], walls[:, 2, 1], walls[:, 2, 2] = t0, b0, t1
+    walls[:, 3, 0], walls[:, 3, 1], walls[:, 3, 2] = b0, b1, t1
+
+def fill_normals(data, chunk=1 << 18):
+    """
+    分块算法向量写进data['normals']，和numpy-stl保存时算的一样（float32的 (v1-v0)×(v2-v0)），
+    但不会为整个模型再分配几份临时数组
+    """
+    vectors, normals = data['vectors'], data['normals']
+    for start in range(0, len(data), chunk):
+        v = vectors[start:start + chunk]
+        normals[start:start + chunk] = np.cross(v[:, 1] - v[:, 0], v[:, 2] - v[:, 0])
+
+def _write_header(f, output_filename, count):
+    """文件头让numpy-stl自己写（格式完全一样），写完再把三角形数改成真正的总数"""
+    empty = mesh.Mesh(np.zeros(0, dtype=mesh.Mesh.dtype), calculate_normals=False)
+    empty.save(output_filename, fh=f, update_normals=False)
+    f.seek(80)
+    f.write(struct.pack('<I', count))
+
+def _build_band(depth_map, base_height, start, stop, out):
+    """
+    顶面第start..stop-1行像素的三角形填进out（连法向量），返回拼侧墙要用的外圈顶点：
+    (第一行, 最后一行, 左列, 右列)；左右两列不含最后一行（它也是下一段的第一行）
+    """
+    vertices = vertex_grid(depth_map, base_height, start, stop)
+    fill_top(out['vectors'], vertices)
+    fill_normals(out)
+    return vertices[0].copy(), vertices[-1].copy(), vertices[:-1, 0].copy(), vertices[:-1, -1].copy()
+
+def _sides(edges, width, height):
+    """按顺序拼好各段的外圈顶点，算出基座和侧墙的三角形"""
+    left = np.concatenate([e[2] for e in edges] + [edges[-1][1][:1]])
+    right = np.concatenate([e[3] for e in edges] + [edges[-1][1][-1:]])
+    data = np.zeros(2 + 4 * width + 4 * height, dtype=mesh.Mesh.dtype)
+    fill_sides(data['vectors'], edges[0][0], edges[-1][1], left, right)
+    fill_normals(data)
+    return data
+
+def write_stl_streaming(depth_map, output_filename, base_height, band_faces=1 << 19):
+    """
+    流式导出：先写文件头和三角形总数，再一段一段（每段约band_faces个三角形）算顶面写进文件，
+    最后写基座和侧墙。内存里只有一段的顶点和三角形，加上网格最外面一圈顶点，不随图像大小增长；
+    写出来的文件和一次性生成再numpy-stl保存的逐字节相同（文件头里的时间除外）。
+    """
+    height, width = depth_map.shape
+    band = max(1, band_faces // (2 * width))
+    edges = []
+    with open(output_filename, 'wb') as f:
+        _write_header(f, output_filename, face_count(width, height))
+        for start in range(0, height, band):
+            stop = min(start + band, height)
+            data = np.zeros(2 * width * (stop - start), dtype=mesh.Mesh.dtype)
+            edges.append(_build_band(depth_map, base_height, start, stop, data))
+            data.tofile(f)
+        _sides(edges, width, height).tofile(f)
+
+# -------------------------- 多进程分块 --------------------------
+# 图像按行切成若干块，每块多带一行像素（块边上那一行顶点要用到上一块最后一行像素），交给进程池；
+# 灰度像素放在共享内存里，各进程直接读，不用复制；每块的三角形在文件里的位置是固定的，
+# 各进程把自己那块直接写进内存映射的输出文件，最后主进程补上基座和侧墙，和单进程的结果逐字节相同。
+
+_tile = None    # 每个工作进程自己的 (共享内存, 深度图, 基座高度, 输出文件的内存映射)
+
+def _init_tile_worker(shm_name, shape, min_thickness, max_thickness, base_height, output_filename, count):
+    global _tile
+    shm = shared_memory.SharedMemory(name=shm_name)
+    pixels = np.ndarray(shape, dtype=np.uint8, buffer=shm.buf)
+    out = np.memmap(output_filename, dtype=mesh.Mesh.dtype, mode='r+', offset=84, shape=(count,))
+    _tile = (shm, DepthMap(pixels, min_thickness, max_thickness), base_height, out)
+
+def _build_tile(start, stop):
+    _, depth_map, base_height, out = _tile
+    width = depth_map.shape[1]
+    edges = _build_band(depth_map, base_height, start, stop, out[2 * width * start:2 * width * stop])
+    out.flush()
+    return edges
+
+def write_stl_parallel(pixels, min_thickness, max_thickness, output_filename, base_height, jobs=None,
+                       band_faces=1 << 19):
+    """
+    多进程导出，jobs是进程数（None是CPU核数）。每块最多约band_faces个三角形，
+    块数至少是进程数的4倍，快慢不一的块能摊平。
+    """
+    height, width = pixels.shape
+    count = face_count(width, height)
+    jobs = jobs or os.cpu_count() or 1
+    band = max(1, min(band_faces // (2 * width), -(-height // (4 * jobs))))
+
+    with open(output_filename, 'wb') as f:
+        _write_header(f, output_filename, count)
+        f.truncate(84 + count * mesh.Mesh.dtype.itemsize)
+
+    shm = shared_memory.SharedMemory(create=True, size=max(pixels.nbytes, 1))
+    try:
+        np.ndarray(pixels.shape, dtype=np.uint8, buffer=shm.buf)[:] = pixels
+        starts = range(0, height, band)
+        with ProcessPoolExecutor(jobs, initializer=_init_tile_worker,
+                                 initargs=(shm.name, pixels.shape, min_thickness, max_thickness, base_height,
+                                           output_filename, count)) as pool:
+            # map按提交顺序返回，外圈顶点正好按行拼起来
+            edges = list(pool.map(_build_tile, starts, [min(start + band, height) for start in starts]))
+    finally:
+        shm.close()
+        shm.unlink()
+
+    out = np.memmap(output_filename, dtype=mesh.Mesh.dtype, mode='r+', offset=84, shape=(count,))
+    out[2 * width * height:] = _sides(edges, width, height)
+    out.flush()
+    del out
+
+# -------------------------- 自适应简化 --------------------------
+# 把顶点网格分成最大max_cell x max_cell的正方形格子，格子里高度够平（误差在范围内）就整个用几个大三角形，
+# 否则分成四个小格子再看，一直分到1个像素（和原来一样两个三角形）。
+# 格子用中心点向四周连成扇形；旁边的格子更小时，边上多出来的顶点也连进扇形里，所以不会有裂缝。
+# 误差保证：每个原始顶点处，简化后的表面和原来的高度相差不超过max_error（毫米）。
+#   格子接受的条件是所有顶点到"中心+四个角"的扇形面的距离 ≤ max_error/2；
+#   边上多连进来的顶点本身离扇形面也 ≤ max_error/2，所以细分后的扇形离原高度 ≤ max_error。
+#   没有多出来的顶点、沿对角线切成两个三角形误差也 ≤ max_error 的格子，只用两个三角形。
+
+def _fan_weights(s):
+    """
+    边长s（偶数）的格子里每个顶点在扇形面上的插值权重，形状 (s+1, s+1, 5)，
+    对应 [左上, 右上, 左下, 右下, 中心] 的高度；扇形是中心和四条边组成的四个三角形
+    """
+    v, u = np.mgrid[0:s + 1, 0:s + 1] / s
+    weights = np.zeros((s + 1, s + 1, 5))
+    c = 0.5
+    # 四个三角形：上(左上,右上) 右(右上,右下) 下(右下,左下) 左(左下,左上)
+    triangles = [((0, 0), (1, 0), 0, 1), ((1, 0), (1, 1), 1, 3), ((1, 1), (0, 1), 3, 2), ((0, 1), (0, 0), 2, 0)]
+    for (ax, ay), (bx, by), ia, ib in triangles:
+        # 重心坐标：p = c + α(a - c) + β(b - c)
+        det = (ax - c) * (by - c) - (bx - c) * (ay - c)
+        alpha = ((u - c) * (by - c) - (bx - c) * (v - c)) / det
+        beta = ((ax - c) * (v - c) - (u - c) * (ay - c)) / det
+        inside = (alpha >= -1e-9) & (beta >= -1e-9) & (alpha + beta <= 1 + 1e-9)
+        weights[inside, ia] = alpha[inside]
+        weights[inside, ib] = beta[inside]
+        weights[inside, 4] = (1 - alpha - beta)[inside]
+    return weights
+
+def _diagonal_weights(s):
+    """沿右上-左下对角线切成两个三角形（和原来每个像素的切法一样）时的插值权重，形状 (s+1, s+1, 5)"""
+    v, u = np.mgrid[0:s + 1, 0:s + 1] / s
+    weights = np.zeros((s + 1, s + 1, 5))
+    upper = u + v <= 1
+    weights[..., 0] = np.where(upper, 1 - u - v, 0)
+    weights[..., 1] = np.where(upper, u, 1 - v)
+    weights[..., 2] = np.where(upper, v, 1 - u)
+    weights[..., 3] = np.where(upper, 0, u + v - 1)
+    return weights
+
+def _cell_errors(z, s, weights, chunk=1 << 22):
+    """
+    所有完整在图像里的、边长s的格子：格子里的顶点高度离weights插值出来的面最远有多远，
+    形状 (height // s, width // s)；按行分块算，内存不随图像大小增长
+    """
+    ny, nx = (z.shape[0] - 1) // s, (z.shape[1] - 1) // s
+    rs, cs = z.strides
+    errors = np.empty((ny, nx))
+    rows = max(1, chunk // max(1, nx * (s + 1) ** 2))
+    half = s // 2
+    for y0 in range(0, ny, rows):
+        y1 = min(y0 + rows, ny)
+        # 每个格子的 (s+1) x (s+1) 个顶点，相邻格子共用边上的顶点（只是视图，不复制）
+        cells = np.lib.stride_tricks.as_strided(z[y0 * s:], (y1 - y0, nx, s + 1, s + 1), (s * rs, s * cs, rs, cs))
+        # 四个角和中心的高度
+        keys = np.stack([z[y0 * s:y1 * s:s, 0:nx * s:s], z[y0 * s:y1 * s:s, s:nx * s + 1:s],
+                         z[(y0 + 1) * s:y1 * s + 1:s, 0:nx * s:s], z[(y0 + 1) * s:y1 * s + 1:s, s:nx * s + 1:s],
+                         z[y0 * s + half:y1 * s:s, half:nx * s:s]], axis=-1)
+        surface = np.einsum('uvk,yxk->yxuv', weights, keys)
+        errors[y0:y1] = np.abs(cells - surface).max(axis=(2, 3))
+    return errors
+
+def _leaves(z, max_error, max_cell):
+    """
+    自上而下决定每一级用哪些格子：返回 {边长s: 布尔数组}，True的格子是最终用到的格子。
+    格子按s对齐；超出图像的、误差太大的继续往下分，分到1个像素为止
+    """
+    height, width = z.shape[0] - 1, z.shape[1] - 1
+    sizes = [max_cell]
+    while sizes[-1] > 1:
+        sizes.append(sizes[-1] // 2)
+    covered = np.zeros((-(-height // max_cell), -(-width // max_cell)), bool)
+    leaves = {}
+    for s in sizes:
+        ok = np.zeros(covered.shape, bool)
+        if s == 1:
+            ok[:] = True
+        else:
+            ok[:height // s, :width // s] = _cell_errors(z, s, _fan_weights(s)) <= max_error / 2
+        leaves[s] = ok & ~covered
+        if s > 1:
+            covered = (covered | leaves[s]).repeat(2, 0).repeat(2, 1)
+            covered = covered[:-(-height // (s // 2)), :-(-width // (s // 2))]
+    return leaves
+
+def _perimeter(s):
+    """格子边上4s个顶点的局部坐标 (u, v)，从左上角开始在图像里顺时针走一圈（翻转Y以后是顺时针）"""
+    k = np.arange(s)
+    u = np.concatenate([k, np.full(s, s), s - k, np.zeros(s, int)])
+    v = np.concatenate([np.zeros(s, int), k, np.full(s, s), s - k])
+    return u, v
+
+def _wall_strip(top_edge, flip):
+    """一条边上的侧墙：相邻两个顶点和它们压到z=0的点组成两个三角形，flip决定朝哪边"""
+    bottom_edge = top_edge.copy()
+    bottom_edge[:, 2] = 0
+    t0, t1, b0, b1 = top_edge[:-1], top_edge[1:], bottom_edge[:-1], bottom_edge[1:]
+    if flip:
+        return np.stack([np.stack([t0, b0, t1], 1), np.stack([b0, b1, t1], 1)], 1).reshape(-1, 3, 3)
+    return np.stack([np.stack([t0, t1, b0], 1), np.stack([b0, t1, b1], 1)], 1).reshape(-1, 3, 3)
+
+def adaptive_mesh(vertices, max_error, max_cell=64):
+    """
+    自适应简化的网格：高度变化不大的地方合成大三角形，每个原始顶点处高度误差不超过max_error（毫米）。
+    顶面、侧墙、底面首尾相接没有缝（每条边正好被两个三角形共用），法向量都朝外。
+    vertices是vertex_grid算出的整张顶点网格；max_cell是格子最大边长（2的幂）。
+    返回填好的mesh.Mesh.dtype数组（法向量也算好了）。
+    """
+    z = np.ascontiguousarray(vertices[..., 2])
+    height, width = z.shape[0] - 1, z.shape[1] - 1
+
+    def point(x, y):
+        # Y坐标使用 (height - y) 来修正图像上下颠倒的问题
+        return np.stack([x, height - y, z[y, x]], axis=-1).astype(float)
+
+    leaves = _leaves(z, max_error, max_cell)
+
+    # 用到的顶点：所有格子的四个角
+    used = np.zeros(z.shape, bool)
+    corners = {}
+    for s, leaf in leaves.items():
+        ys, xs = np.nonzero(leaf)
+        y0, x0 = ys * s, xs * s
+        corners[s] = (x0, y0)
+        for dy in (0, s):
+            for dx in (0, s):
+                used[y0 + dy, x0 + dx] = True
+
+    parts = []
+    for s, (x0, y0) in corners.items():
+        if len(x0) == 0:
+            continue
+        v1, v2, v3, v4 = point(x0, y0), point(x0 + s, y0), point(x0, y0 + s), point(x0 + s, y0 + s)
+        if s == 1:
+            # 一个像素：和原来一样 [v1, v3, v2] [v2, v3, v4]
+            parts.append(np.stack([np.stack([v1, v3, v2], 1), np.stack([v2, v3, v4], 1)], 1).reshape(-1, 3, 3))
+            continue
+        u, v = _perimeter(s)
+        mask = used[y0[:, None] + v, x0[:, None] + u]
+        simple = mask.sum(axis=1) == 4      # 边上只有自己的四个角
+        if simple.any():
+            errors = _cell_errors(z, s, _diagonal_weights(s))[y0 // s, x0 // s]
+            simple &= errors <= max_error
+            parts.append(np.stack([np.stack([v1, v3, v2], 1), np.stack([v2, v3, v4], 1)], 1)[simple].reshape(-1, 3, 3))
+
+        # 其余的格子：中心点和边上用到的顶点连成扇形
+        fan = ~simple
+        if not fan.any():
+            continue
+        leaf, k = np.nonzero(mask[fan])
+        fx, fy = x0[fan][leaf], y0[fan][leaf]
+        order = np.arange(len(k))
+        starts = np.flatnonzero(np.r_[True, leaf[1:] != leaf[:-1]])
+        nxt = order + 1
+        nxt[np.r_[starts[1:], len(k)] - 1] = starts
+        center = point(fx + s // 2, fy + s // 2)
+        p = point(fx + u[k], fy + v[k])
+        # 边上的点是顺时针排的，三角形反过来连，法向量才朝上
+        parts.append(np.stack([center, p[nxt], p], 1))
+
+    # 侧墙：四条边上用到的顶点之间各两个三角形
+    xs, ys = np.flatnonzero(used[0]), np.flatnonzero(used[:, 0])
+    xs_b, ys_r = np.flatnonzero(used[height]), np.flatnonzero(used[:, width])
+    top_edge, bottom_edge = point(xs, np.zeros_like(xs)), point(xs_b, np.full_like(xs_b, height))
+    left_edge, right_edge = point(np.zeros_like(ys), ys), point(np.full_like(ys_r, width), ys_r)
+    parts += [_wall_strip(top_edge, False), _wall_strip(bottom_edge, True),
+              _wall_strip(left_edge, True), _wall_strip(right_edge, False)]
+
+    # 底面：底边一圈的点和底面中心连成扇形（不用两个大三角形，否则和侧墙底边接不上）
+    ring = np.concatenate([top_edge[:-1], right_edge[:-1], bottom_edge[::-1][:-1], left_edge[::-1][:-1]])
+    ring[:, 2] = 0
+    center = np.tile([width / 2, height / 2, 0], (len(ring), 1))
+    parts.append(np.stack([center, ring, np.roll(ring, -1, axis=0)], 1))
+
+    data = np.zeros(sum(len(part) for part in parts), dtype=mesh.Mesh.dtype)
+    start = 0
+    for part in parts:
+        data['vectors'][start:start + len(part)] = part
+        start += len(part)
+    fill_normals(data)
+    return data
+
+def open_edges(vectors):
+    """
+    检查网格是不是封闭的：每条有向边都应该正好出现一次，它的反方向也正好出现一次。
+    返回不满足的边数（0就是没有缝、朝向一致）
+    """
+    points = vectors.reshape(-1, 3)
+    _, ids = np.unique(points, axis=0, return_inverse=True)
+    ids = ids.reshape(-1, 3)
+    edges = np.concatenate([ids[:, [0, 1]], ids[:, [1, 2]], ids[:, [2, 0]]])
+    keys = edges[:, 0].astype(np.int64) * (ids.max() + 1) + edges[:, 1]
+    reverse = edges[:, 1].astype(np.int64) * (ids.max() + 1) + edges[:, 0]
+    keys, counts = np.unique(keys, return_counts=True)
+    reverse = np.unique(reverse)
+    return int((counts != 1).sum() + len(np.setxor1d(keys, reverse)))
+
+def image_to_stl(image_path, output_filename, min_thickness=1.0, max_thickness=3.0, base_height=0.5,
+                 streaming=False, max_error=None, jobs=1, log=print):
+    """
+    create_stl_from_image的本体：出错直接抛异常，返回写出的三角形数；进度信息交给log（批量处理时不打印）
+    """
+    # 1. 加载图像并转换为灰度图
+    img = Image.open(image_path).convert('L')
+    width, height = img.size
+    pixels = np.array(img)
+    log(f"图像加载成功: {width}x{height} 像素")
+
+    # 2. 将灰度值映射到厚度
+    depth_map = DepthMap(pixels, min_thickness, max_thickness)
+    if max_error is not None and (streaming or jobs != 1):
+        raise ValueError("自适应简化不能和流式导出、多进程一起用")
+    if jobs != 1:
+        write_stl_parallel(pixels, min_thickness, max_thickness, output_filename, base_height, jobs)
+        return face_count(width, height)
+    if streaming:
+        write_stl_streaming(depth_map, output_filename, base_height)
+        return face_count(width, height)
+
+    # 3. 创建顶点 (已修正Y轴)
+    vertices = vertex_grid(depth_map[:], base_height)
+
+    # 4~6. 顶面、底部基座、侧面墙体的三角形直接填进预先分配好的STL数组
+    data = None
+    if max_error is not None:
+        data = adaptive_mesh(vertices, max_error)
+        full = face_count(width, height)
+        if len(data) < full:
+            log(f"自适应简化：{len(data)} 个三角形（原来 {full} 个，减少 {100 * (1 - len(data) / full):.1f}%），"
+                f"高度误差不超过 {max_error} mm")
+        else:
+            # 细节多的图几乎合不成大格子，底面的扇形反而比两个三角形多，不如不简化
+            log(f"自适应简化没有变少（{len(data)} 个三角形，原来 {full} 个），改用完整网格")
+            data = None
+    if data is None:
+        data = np.zeros(face_count(width, height), dtype=mesh.Mesh.dtype)
+        fill_faces(data['vectors'], vertices)
+        fill_normals(data)
+    del vertices
+
+    # 7. 创建STL模型并保存（法向量上面已经算好了）
+    relief_mesh = mesh.Mesh(data, calculate_normals=False)
+    relief_mesh.save(output_filename, update_normals=False)
+    return len(data)
+
+def create_stl_from_image(image_path, output_filename, min_thickness=1.0, max_thickness=3.0, base_height=0.5,
+                          streaming=False, max_error=None, jobs=1):
     """
     通过灰度图像生成一个带有基座的STL浮雕文件。
     (已修正Y轴翻转问题)
@@ -13,93 +478,14 @@ def create_stl_from_image(image_path, output_filename, min_thickness=1.0, max_th
     min_thickness (float): 对应图像最亮部分（白色）的浮雕厚度（毫米）。
     max_thickness (float): 对应图像最暗部分（黑色）的浮雕厚度（毫米）。
     base_height (float): 基座的高度（毫米）。
+    streaming (bool): 流式导出，一段一段算一段一段写，特别大的图也不会占满内存。
+    max_error (float): 给了就自适应简化：平坦的地方合成大三角形，高度误差不超过这么多（毫米）；
+                       简化后三角形反而更多时用完整网格。
+    jobs (int): 进程数，大于1（或None=CPU核数）时多进程分块生成，结果和单进程逐字节相同。
     """
     try:
-        # 1. 加载图像并转换为灰度图
-        img = Image.open(image_path).convert('L')
-        width, height = img.size
-        pixels = np.array(img)
-        print(f"图像加载成功: {width}x{height} 像素")
-
-        # 2. 将灰度值映射到厚度
-        inverted_pixels = 255 - pixels
-        normalized_height = inverted_pixels / 255.0
-        depth_map = min_thickness + (max_thickness - min_thickness) * normalized_height
-
-        # 3. 创建顶点 (已修正Y轴)
-        vertices = np.zeros((height + 1, width + 1, 3))
-        for y in range(height + 1):
-            for x in range(width + 1):
-                # 对四个相邻像素的深度值取平均，以平滑顶点高度
-                z = np.mean(depth_map[max(0, y-1):min(height, y+1), max(0, x-1):min(width, x+1)])
-                # Y坐标使用 (height - y) 来修正图像上下颠倒的问题
-                vertices[y, x] = [x, height - y, z + base_height]
-
-        # 4. 创建面片 (两个三角形组成一个正方形)
-        faces = []
-        for y in range(height):
-            for x in range(width):
-                # 定义一个正方形的四个顶点
-                v1 = vertices[y, x]
-                v2 = vertices[y, x + 1]
-                v3 = vertices[y + 1, x]
-                v4 = vertices[y + 1, x + 1]
-
-                # 创建两个三角形面片
-                faces.append([v1, v3, v2])
-                faces.append([v2, v3, v4])
-
-        # 5. 创建底部基座
-        base_vertices = np.array([
-            [0, 0, 0],
-            [width, 0, 0],
-            [0, height, 0],
-            [width, height, 0]
-        ])
-        # 基座底部的两个三角形
-        faces.append([base_vertices[0], base_vertices[1], base_vertices[2]])
-        faces.append([base_vertices[2], base_vertices[1], base_vertices[3]])
-
-        # 6. 创建侧面墙体
-        # 顶部边缘
-        top_edge_y0 = vertices[0, :, :]      # 图像顶部 (y=height)
-        top_edge_yH = vertices[height, :, :] # 图像底部 (y=0)
-        top_edge_x0 = vertices[:, 0, :]      # 图像左侧
-        top_edge_xW = vertices[:, width, :]  # 图像右侧
-
-        # 底部边缘
-        bottom_edge_y0 = np.copy(top_edge_y0)
-        bottom_edge_y0[:, 2] = 0
-        bottom_edge_yH = np.copy(top_edge_yH)
-        bottom_edge_yH[:, 2] = 0
-        bottom_edge_x0 = np.copy(top_edge_x0)
-        bottom_edge_x0[:, 2] = 0
-        bottom_edge_xW = np.copy(top_edge_xW)
-        bottom_edge_xW[:, 2] = 0
-
-        # 连接侧面 (此部分逻辑无需更改)
-        for i in range(width):
-            faces.append([top_edge_y0[i], bottom_edge_y0[i], top_edge_y0[i+1]])
-            faces.append([bottom_edge_y0[i], bottom_edge_y0[i+1], top_edge_y0[i+1]])
-
-            faces.append([top_edge_yH[i], top_edge_yH[i+1], bottom_edge_yH[i]])
-            faces.append([bottom_edge_yH[i], top_edge_yH[i+1], bottom_edge_yH[i+1]])
-
-        for i in range(height):
-            faces.append([top_edge_x0[i], top_edge_x0[i+1], bottom_edge_x0[i]])
-            faces.append([bottom_edge_x0[i], top_edge_x0[i+1], bottom_edge_x0[i+1]])
-
-            faces.append([top_edge_xW[i], bottom_edge_xW[i], top_edge_xW[i+1]])
-            faces.append([bottom_edge_xW[i], bottom_edge_xW[i+1], top_edge_xW[i+1]])
-
-        # 7. 创建STL模型并保存
-        faces_np = np.array(faces)
-        relief_mesh = mesh.Mesh(np.zeros(faces_np.shape[0], dtype=mesh.Mesh.dtype))
-        for i, f in enumerate(faces_np):
-            for j in range(3):
-                relief_mesh.vectors[i][j] = f[j]
-
-        relief_mesh.save(output_filename)
+        image_to_stl(image_path, output_filename, min_thickness, max_thickness, base_height,
+                     streaming, max_error, jobs)
         print(f"STL文件 '{output_filename}' 已成功生成！")
 
     except FileNotFoundError:
@@ -111,9 +497,15 @@ if __name__ == '__main__':
     # --- 用户配置 ---
     input_image_file = 'img.png'
     output_stl_file = 'output_relief_corrected.stl'
+    streaming = False  # 图特别大（比如8000x8000）时改成True，边算边写，内存占用不随图像大小增长
+    max_error = None  # 比如0.05：平坦的地方（白底之类）合成大三角形，高度误差不超过0.05毫米，文件小很多
+    jobs = 1  # 进程数，None是用上所有CPU核（大图更快，结果完全一样）
 
     # --- 调用函数 ---
     create_stl_from_image(input_image_file, output_stl_file,
                            min_thickness=1.0,
                            max_thickness=2.5,
-                           base_height=0)
+                           base_height=0,
+                           streaming=streaming,
+                           max_error=max_error,
+                           jobs=jobs)
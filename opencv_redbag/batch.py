@@ -0,0 +1,201 @@
+#TEST2.py / dan.py 的批量版：一个文件夹的截图分给多个进程处理
+#每张图输出 掩膜（dan.py的mask.png）、去掉非红色的图（TEST2.py的Result.png）、圈出最大周长轮廓的图（dan.py的QQ!.png），
+#输出图按 图片名_种类.png 命名，a.png和a.jpg这样图片名撞了的带上扩展名（a_png_mask.png），
+#再汇总一张csv：每张图最大周长轮廓的周长、面积、外接矩形
+#已经处理过、图片和参数都没变的跳过（按修改时间+大小，或者按文件内容的sha1）
+#用法：python batch.py 截图文件夹 -o 输出文件夹 [-j 进程数] [--cache hash] [--bands test2] [--force]
+
+import argparse
+import csv
+import hashlib
+import json
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import cv2
+import numpy as np
+
+from calibrate import imread, list_images
+from detect import contours_engine
+from redbag import lower_red1, lower_red2, upper_red1, upper_red2
+from redmask import RedMask
+
+# 两套红色区间：bot实际用的（redbag.py，dan.py也是这一套），和TEST2.py里第二个区间S下界是133的
+BANDS = {
+    'redbag': ((lower_red1, upper_red1), (lower_red2, upper_red2)),
+    'test2': ((lower_red1, upper_red1), (np.array([179, 133, 100]), np.array([180, 255, 255]))),
+}
+
+OUTPUTS = ('mask', 'result', 'annotated')
+CSV_FIELDS = ('file', 'width', 'height', 'contours', 'perimeter', 'area', 'x', 'y', 'w', 'h', 'ms')
+CACHE_NAME = 'batch_cache.json'
+CSV_NAME = 'batch.csv'
+
+_red = None     # 每个进程自己的查表掩膜，进程启动时建一次
+
+
+def _init_worker(bands):
+    global _red
+    _red = RedMask(bands)
+
+
+def imwrite(path, image):
+    """写图片，兼容中文路径"""
+    ok, data = cv2.imencode(os.path.splitext(path)[1], image)
+    if not ok:
+        raise IOError(f"编码失败: {path}")
+    data.tofile(path)
+
+
+def output_stems(paths):
+    """
+    每张图输出文件名用的前缀：一般就是图片名去掉扩展名；
+    a.png和a.jpg会撞，撞了的带上扩展名（a_png、a_jpg），这样还撞（比如正好有一张a_png.bmp）就再带上路径的短哈希
+    """
+    def clashes(stems):
+        counts = Counter(stems.values())
+        return [p for p, stem in stems.items() if counts[stem] > 1]
+
+    stems = {p: os.path.splitext(os.path.basename(p))[0] for p in paths}
+    for p in clashes(stems):
+        stem, ext = os.path.splitext(os.path.basename(p))
+        stems[p] = f"{stem}_{ext[1:].lower()}"
+    for p in clashes(stems):
+        stems[p] += '_' + hashlib.sha1(os.path.abspath(p).encode('utf-8')).hexdigest()[:8]
+    return stems
+
+
+def output_paths(stem, out_dir):
+    return {kind: os.path.join(out_dir, f"{stem}_{kind}.png") for kind in OUTPUTS}
+
+
+def file_key(path, mode):
+    """判断图片有没有变的依据：mtime模式是 修改时间+大小，hash模式是文件内容的sha1"""
+    if mode == 'hash':
+        digest = hashlib.sha1()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+        return digest.hexdigest()
+    st = os.stat(path)
+    return f"{st.st_mtime_ns}:{st.st_size}"
+
+
+def analyze(path, stem, out_dir):
+    """在子进程里处理一张图，写出三张输出图（文件名前缀是stem），返回csv的一行（字典）"""
+    start = time.perf_counter()
+    frame = imread(path)
+    if frame is None:
+        raise IOError(f"无法读取图片: {path}")
+    mask = _red(frame).copy()
+    paths = output_paths(stem, out_dir)
+    imwrite(paths['mask'], mask)
+    # 去掉非红色部分
+    imwrite(paths['result'], cv2.bitwise_and(frame, frame, mask=mask))
+
+    features = contours_engine(mask)
+    row = {'file': os.path.basename(path), 'width': frame.shape[1], 'height': frame.shape[0],
+           'contours': len(features), 'perimeter': '', 'area': '', 'x': '', 'y': '', 'w': '', 'h': ''}
+    i = features.largest_perimeter()
+    if i is not None:
+        best = features.rows[i]
+        # 用绿色圈出最大周长的轮廓
+        cv2.drawContours(frame, [features.contours[i]], -1, (0, 255, 0), 2)
+        row.update(perimeter=round(float(best['perimeter']), 2), area=round(float(best['area']), 1),
+                   x=int(best['x']), y=int(best['y']), w=int(best['w']), h=int(best['h']))
+    imwrite(paths['annotated'], frame)
+    row['ms'] = round((time.perf_counter() - start) * 1000, 1)
+    return row
+
+
+def load_cache(out_dir):
+    try:
+        with open(os.path.join(out_dir, CACHE_NAME), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_cache(out_dir, cache):
+    tmp = os.path.join(out_dir, CACHE_NAME + '.tmp')
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(cache, f, ensure_ascii=False, indent=1)
+    os.replace(tmp, os.path.join(out_dir, CACHE_NAME))
+
+
+def up_to_date(entry, key, settings, stem, out_dir):
+    """图片没变、参数没变、输出文件名没变、三张输出图都还在"""
+    return (entry is not None and entry['key'] == key and entry['settings'] == settings
+            and entry.get('stem') == stem
+            and all(os.path.exists(p) for p in output_paths(stem, out_dir).values()))
+
+
+def run(paths, out_dir, bands='redbag', jobs=None, cache_mode='mtime', force=False):
+    """处理paths里需要处理的图片，返回 (csv的所有行, 处理了几张, 跳过了几张, 失败的图片名)"""
+    os.makedirs(out_dir, exist_ok=True)
+    cache = {} if force else load_cache(out_dir)
+    settings = {'bands': bands, 'cache': cache_mode}
+    stems = output_stems(paths)
+
+    todo, keys, failed = [], {}, []
+    for path in paths:
+        name = os.path.basename(path)
+        keys[name] = file_key(path, cache_mode)
+        if not up_to_date(cache.get(name), keys[name], settings, stems[path], out_dir):
+            todo.append(path)
+
+    if todo:
+        with ProcessPoolExecutor(jobs, initializer=_init_worker, initargs=(BANDS[bands],)) as pool:
+            futures = {pool.submit(analyze, path, stems[path], out_dir): path for path in todo}
+            for future in as_completed(futures):
+                path = futures[future]
+                name = os.path.basename(path)
+                try:
+                    row = future.result()
+                except Exception as e:
+                    print(f"{name}: {e}")
+                    cache.pop(name, None)
+                    failed.append(name)
+                    continue
+                cache[name] = {'key': keys[name], 'settings': settings, 'stem': stems[path], 'row': row}
+                print(f"{name}: 周长 {row['perimeter']} 面积 {row['area']} ({row['ms']} ms)")
+
+    # 只保留这次还在文件夹里的图片
+    cache = {name: entry for name, entry in cache.items() if name in keys}
+    save_cache(out_dir, cache)
+    rows = [cache[os.path.basename(p)]['row'] for p in paths if os.path.basename(p) in cache]
+    with open(os.path.join(out_dir, CSV_NAME), 'w', newline='', encoding='utf-8-sig') as f:
+        writer = csv.DictWriter(f, fieldnames=CSV_FIELDS)
+        writer.writeheader()
+        writer.writerows(rows)
+    return rows, len(todo) - len(failed), len(paths) - len(todo), sorted(failed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='批量生成掩膜/筛选结果/最大轮廓，并汇总周长面积')
+    parser.add_argument('path', nargs='?', default='../images', help='图片或图片文件夹')
+    parser.add_argument('-o', '--out', default='batch_out', help='输出文件夹（csv和缓存也在这里）')
+    parser.add_argument('-j', '--jobs', type=int, default=None, help='进程数，默认等于CPU核数')
+    parser.add_argument('--bands', default='redbag', choices=sorted(BANDS), help='用哪套红色区间')
+    parser.add_argument('--cache', default='mtime', choices=('mtime', 'hash'),
+                        help='判断图片有没有变：修改时间+大小，或文件内容的sha1')
+    parser.add_argument('--force', action='store_true', help='忽略缓存，全部重新处理')
+    args = parser.parse_args()
+
+    paths = list_images(args.path)
+    if not paths:
+        print('没有找到图片', args.path)
+        return
+    start = time.perf_counter()
+    rows, done, skipped, failed = run(paths, args.out, args.bands, args.jobs, args.cache, args.force)
+    print(f"共 {len(paths)} 张：处理 {done} 张，跳过 {skipped} 张（没有变化），失败 {len(failed)} 张，"
+          f"用时 {time.perf_counter() - start:.2f}s")
+    if failed:
+        print("失败的图片：", '，'.join(failed))
+    print("结果汇总在", os.path.join(args.out, CSV_NAME))
+
+
+if __name__ == '__main__':
+    main()
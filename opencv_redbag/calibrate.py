@@ -0,0 +1,223 @@
+#hsv范围标定工具：test.py逐像素循环的向量化版本，可以一次扫一整个文件夹的截图
+#用法：python calibrate.py ../images  （也可以直接给单张图片）
+#输出两个区间的min/max、百分位数、H/S二维直方图的峰值，以及可以直接复制进final manba.py的lower_red*/upper_red*
+
+import argparse
+import os
+import time
+
+import cv2
+import numpy as np
+
+# 初筛用的红色hsv，与test.py一致
+lower_red1 = np.array([0, 133, 100])
+upper_red1 = np.array([2, 255, 255])
+lower_red2 = np.array([179, 100, 100])
+upper_red2 = np.array([180, 255, 255])
+
+# 统计用的两个色相区间（test.py里的 0<=h<=10 和 160<=h<=179）
+HUE_BANDS = ((0, 10), (160, 179))
+
+IMAGE_EXTS = ('.png', '.jpg', '.jpeg', '.bmp')
+
+
+def imread(path):
+    """读取图片，兼容中文路径（cv2.imread在windows下不认中文路径）"""
+    data = np.fromfile(path, dtype=np.uint8)
+    if data.size == 0:
+        return None
+    return cv2.imdecode(data, cv2.IMREAD_COLOR)
+
+
+def list_images(path):
+    """path是文件就返回它本身，是文件夹就返回里面所有图片（按文件名排序）"""
+    if os.path.isfile(path):
+        return [path]
+    names = sorted(n for n in os.listdir(path) if n.lower().endswith(IMAGE_EXTS))
+    return [os.path.join(path, n) for n in names]
+
+
+def red_mask(hsv):
+    """两个区间的红色掩膜（和test.py完全相同）"""
+    mask1 = cv2.inRange(hsv, lower_red1, upper_red1)
+    mask2 = cv2.inRange(hsv, lower_red2, upper_red2)
+    return cv2.bitwise_or(mask1, mask2)
+
+
+def band_histograms(hsv, mask, bands=HUE_BANDS):
+    """
+    对每个色相区间内的掩膜像素，分别统计H/S/V三个通道的256级直方图。
+
+    返回 shape 为 (len(bands), 3, 256) 的int64数组。
+    直方图可以跨多张图累加，min/max/百分位数都从它算，内存占用和图片数量无关。
+    """
+    hist = np.zeros((len(bands), 3, 256), dtype=np.int64)
+    pixels = hsv[mask > 0]          # (N, 3)，只取掩膜里的像素
+    if pixels.size == 0:
+        return hist
+    h = pixels[:, 0]
+    for i, (lo, hi) in enumerate(bands):
+        sel = pixels[(h >= lo) & (h <= hi)]
+        for c in range(3):
+            hist[i, c] = np.bincount(sel[:, c], minlength=256)
+    return hist
+
+
+def hs_histogram(hsv, mask):
+    """掩膜像素的H/S二维直方图，shape (180, 256)"""
+    return cv2.calcHist([hsv], [0, 1], mask, [180, 256], [0, 180, 0, 256])
+
+
+def hist_stats(hist, percentiles=(1, 5, 50, 95, 99)):
+    """
+    从单通道直方图算出 count/min/max/百分位数。
+    没有像素时返回None。
+    """
+    total = int(hist.sum())
+    if total == 0:
+        return None
+    nonzero = np.flatnonzero(hist)
+    cdf = np.cumsum(hist)
+    # 最近秩法：第一个累计数 >= p% * total 的灰度级
+    ranks = np.maximum(np.ceil(np.array(percentiles) / 100.0 * total), 1)
+    values = np.searchsorted(cdf, ranks)
+    return {
+        'count': total,
+        'min': int(nonzero[0]),
+        'max': int(nonzero[-1]),
+        'percentiles': dict(zip(percentiles, (int(v) for v in values))),
+    }
+
+
+def band_minmax(hsv, mask, bands=HUE_BANDS):
+    """
+    test.py原来双重循环算的东西：每个区间的 hmax, hmin, smax, smin, vmax, vmin。
+    区间里没有像素时保持test.py的初始值（max=-1, h_min=180, s/v_min=255）。
+    """
+    hist = band_histograms(hsv, mask, bands)
+    result = []
+    for i in range(len(bands)):
+        row = []
+        for c, empty_min in zip(range(3), (180, 255, 255)):
+            stats = hist_stats(hist[i, c])
+            if stats is None:
+                row += [-1, empty_min]
+            else:
+                row += [stats['max'], stats['min']]
+        result.append(row)
+    return result
+
+
+def suggest_ranges(hist, low_pct=1, high_pct=99):
+    """
+    根据累加后的直方图给出建议的hsv区间。
+    H取实际出现的min/max，S/V取百分位数以去掉零星的噪点。
+    """
+    suggestions = []
+    for i in range(hist.shape[0]):
+        h = hist_stats(hist[i, 0], (low_pct, high_pct))
+        s = hist_stats(hist[i, 1], (low_pct, high_pct))
+        v = hist_stats(hist[i, 2], (low_pct, high_pct))
+        if h is None:
+            suggestions.append(None)
+            continue
+        lower = [h['min'], s['percentiles'][low_pct], v['percentiles'][low_pct]]
+        upper = [h['max'], s['percentiles'][high_pct], v['percentiles'][high_pct]]
+        suggestions.append((lower, upper))
+    return suggestions
+
+
+def calibrate(paths, percentiles=(1, 5, 50, 95, 99), verbose=True):
+    """
+    对一组图片做标定，返回 (band直方图, H/S二维直方图, 每张图耗时列表)。
+    """
+    total_hist = np.zeros((len(HUE_BANDS), 3, 256), dtype=np.int64)
+    total_hs = np.zeros((180, 256), dtype=np.float64)
+    timings = []
+    for path in paths:
+        image = imread(path)
+        if image is None:
+            print('无法读取图片', path)
+            continue
+        start = time.perf_counter()
+        hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
+        mask = red_mask(hsv)
+        hist = band_histograms(hsv, mask)
+        total_hist += hist
+        total_hs += hs_histogram(hsv, mask)
+        elapsed = time.perf_counter() - start
+        timings.append(elapsed)
+
+        if verbose:
+            h, w = image.shape[:2]
+            print(f"{os.path.basename(path)} ({w}x{h}) 用时 {elapsed * 1000:.1f} ms")
+            for i, (lo, hi) in enumerate(HUE_BANDS):
+                stats = [hist_stats(hist[i, c], percentiles) for c in range(3)]
+                if stats[0] is None:
+                    print(f"  区间{i + 1} [{lo},{hi}]: 没有像素")
+                    continue
+                print(f"  区间{i + 1} [{lo},{hi}]: {stats[0]['count']} 像素")
+                for name, st in zip('HSV', stats):
+                    pct = ' '.join(f"p{p}={v}" for p, v in st['percentiles'].items())
+                    print(f"    {name}: min={st['min']} max={st['max']} {pct}")
+    return total_hist, total_hs, timings
+
+
+def print_hs_peaks(hs_hist, top=5):
+    """打印H/S二维直方图里像素最多的几个格子"""
+    flat = hs_hist.ravel()
+    order = np.argsort(flat)[::-1][:top]
+    print(f"H/S直方图峰值（前{top}）：")
+    for idx in order:
+        if flat[idx] == 0:
+            break
+        h, s = np.unravel_index(idx, hs_hist.shape)
+        print(f"  H={h} S={s}: {int(flat[idx])}")
+
+
+def save_hs_histogram(hs_hist, filename):
+    """把H/S二维直方图保存成图片（对数缩放，纵轴H，横轴S）"""
+    img = np.log1p(hs_hist)
+    if img.max() > 0:
+        img = img / img.max() * 255
+    img = cv2.applyColorMap(img.astype(np.uint8), cv2.COLORMAP_JET)
+    ok, buf = cv2.imencode(os.path.splitext(filename)[1] or '.png', img)
+    if ok:
+        buf.tofile(filename)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='红包hsv范围标定')
+    parser.add_argument('path', nargs='?', default='../images', help='图片或图片文件夹')
+    parser.add_argument('--low', type=float, default=1, help='S/V下界使用的百分位数')
+    parser.add_argument('--high', type=float, default=99, help='S/V上界使用的百分位数')
+    parser.add_argument('--hist', help='把H/S二维直方图保存到这个文件')
+    parser.add_argument('-q', '--quiet', action='store_true', help='不打印每张图的统计')
+    args = parser.parse_args()
+
+    paths = list_images(args.path)
+    if not paths:
+        print('没有找到图片', args.path)
+        return
+
+    hist, hs_hist, timings = calibrate(paths, verbose=not args.quiet)
+    if timings:
+        print(f"共 {len(timings)} 张，平均 {np.mean(timings) * 1000:.1f} ms/张，"
+              f"最慢 {max(timings) * 1000:.1f} ms")
+
+    print_hs_peaks(hs_hist)
+    if args.hist:
+        save_hs_histogram(hs_hist, args.hist)
+
+    print("建议的红色hsv区间：")
+    for i, suggestion in enumerate(suggest_ranges(hist, args.low, args.high)):
+        if suggestion is None:
+            print(f"# 区间{i + 1} 没有像素")
+            continue
+        lower, upper = suggestion
+        print(f"lower_red{i + 1} = np.array({lower})")
+        print(f"upper_red{i + 1} = np.array({upper})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,163 @@
+#抓屏组件：mss只开一次，BGRA原始缓冲区零拷贝包成ndarray，掩膜写进预分配好的缓冲区
+#没有屏幕的linux上可以用一个装着录好的png的文件夹代替屏幕
+#测速：python capture.py [图片文件夹] [帧数]
+
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from redmask import RedMask
+
+IMAGE_EXTS = ('.png', '.jpg', '.jpeg', '.bmp')
+
+
+class MssSource:
+    """屏幕源：整个运行期间只保留一个mss实例"""
+
+    def __init__(self, monitor=1):
+        from mss import mss
+        # 这里只读显示器的位置和大小；mss的句柄不能跨线程用（windows下会GetDIBits失败），
+        # 真正抓屏的实例在第一次grab的线程里创建，之后一直留着
+        with mss() as sct:
+            self.monitor = dict(sct.monitors[monitor])
+        self.sct = None
+        self.left = self.monitor['left']
+        self.top = self.monitor['top']
+        self.width = self.monitor['width']
+        self.height = self.monitor['height']
+
+    def grab(self):
+        """抓一帧，返回 (h, w, 4) 的BGRA视图，直接引用mss的缓冲区，不拷贝"""
+        if self.sct is None:
+            from mss import mss
+            self.sct = mss()
+        shot = self.sct.grab(self.monitor)
+        return np.frombuffer(shot.raw, dtype=np.uint8).reshape(shot.height, shot.width, 4)
+
+    def close(self):
+        if self.sct is not None:
+            self.sct.close()
+
+
+class DirectorySource:
+    """文件夹源：按文件名顺序循环播放录好的截图，用于无头环境调试/测速"""
+
+    def __init__(self, folder, loop=True, cache=True, fps=None):
+        names = sorted(n for n in os.listdir(folder) if n.lower().endswith(IMAGE_EXTS))
+        if not names:
+            raise ValueError(f'文件夹里没有图片: {folder}')
+        self.paths = [os.path.join(folder, n) for n in names]
+        self.loop = loop
+        self.cache = {} if cache else None
+        self.index = 0
+        self.interval = 1.0 / fps if fps else 0.0   # 按屏幕刷新率放帧，None表示不限速
+        self.next_time = 0.0
+        first = self._load(0)
+        self.height, self.width = first.shape[:2]
+
+    def _load(self, i):
+        if self.cache is not None and i in self.cache:
+            return self.cache[i]
+        # imdecode兼容中文文件名
+        image = cv2.imdecode(np.fromfile(self.paths[i], dtype=np.uint8), cv2.IMREAD_UNCHANGED)
+        if image is None:
+            raise ValueError(f'无法读取图片: {self.paths[i]}')
+        if image.ndim == 2:
+            image = cv2.cvtColor(image, cv2.COLOR_GRAY2BGRA)
+        elif image.shape[2] == 3:
+            image = cv2.cvtColor(image, cv2.COLOR_BGR2BGRA)
+        if self.cache is not None:
+            self.cache[i] = image
+        return image
+
+    def grab(self):
+        """返回下一帧BGRA；不循环时播完抛出StopIteration"""
+        if self.index >= len(self.paths):
+            if not self.loop:
+                raise StopIteration
+            self.index = 0
+        if self.interval:
+            delay = self.next_time - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            self.next_time = max(self.next_time, time.perf_counter() - self.interval) + self.interval
+        image = self._load(self.index)
+        self.index += 1
+        return image
+
+    def close(self):
+        if self.cache is not None:
+            self.cache.clear()
+
+
+def make_source(spec=None, monitor=1, fps=None):
+    """spec为空用屏幕，是文件夹就用文件夹源（fps给文件夹源限速）"""
+    if spec is None:
+        return MssSource(monitor)
+    if os.path.isdir(spec):
+        return DirectorySource(spec, fps=fps)
+    raise ValueError(f'不认识的抓屏源: {spec}')
+
+
+class CaptureEngine:
+    """
+    抓屏 + 红色掩膜。掩膜直接从BGRA缓冲区查表得到（见redmask.py），写进预分配的缓冲区。
+    read()/process()返回的 (frame, mask) 每帧都会被覆盖，frame就是抓到的BGRA原图，不要在上面画；
+    需要跨帧保留或者画图的话自己copy。
+    """
+
+    def __init__(self, source, lower_red1, upper_red1, lower_red2, upper_red2, downscale=1):
+        self.source = source
+        self.red = RedMask(((lower_red1, upper_red1), (lower_red2, upper_red2)), downscale)
+        self.frames = 0
+
+    def read(self):
+        """抓一帧，返回 (frame, mask)"""
+        return self.process(self.source.grab())
+
+    def process(self, raw, rects=None):
+        """
+        处理一帧已经抓好的BGRA（抓屏和处理不在同一个线程时用）。
+        rects给了的话只重新处理这些矩形 (x, y, w, h)，其余部分沿用上一帧的结果。
+        """
+        if rects is None or raw.shape[:2] != self.red.shape:
+            mask = self.red(raw)
+        else:
+            mask = self.red.mask
+            for rect in rects:
+                mask = self.red(raw, rect)
+        self.frames += 1
+        return raw, mask
+
+    def close(self):
+        self.source.close()
+
+
+def max_rss_mb():
+    """进程峰值内存（MB），拿不到就返回None"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 1024 / 1024 if sys.platform == 'darwin' else rss / 1024
+
+
+if __name__ == '__main__':
+    spec = sys.argv[1] if len(sys.argv) > 1 else None
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 300
+
+    engine = CaptureEngine(make_source(spec),
+                           np.array([0, 133, 100]), np.array([2, 255, 255]),
+                           np.array([179, 100, 100]), np.array([180, 255, 255]))
+    start = time.perf_counter()
+    for i in range(count):
+        engine.read()
+        if (i + 1) % 100 == 0:
+            print(f'{i + 1} 帧, 峰值内存 {max_rss_mb()} MB')
+    elapsed = time.perf_counter() - start
+    engine.close()
+    print(f'{count} 帧用时 {elapsed:.2f}s, {count / elapsed:.1f} fps')
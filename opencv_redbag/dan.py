@@ -1,19 +1,17 @@
 import cv2
 import numpy as np
 
+from redmask import RedMask
+
 # 红色hsv
 lower_red1 = np.array([0, 133, 100])
 upper_red1 = np.array([2, 255, 255])
 lower_red2 = np.array([179, 100, 100])
 upper_red2 = np.array([180, 255, 255])
 frame = cv2.imread('pi3.png', cv2.IMREAD_COLOR)
-    # HSV
-hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
 
-    # 红色掩膜
-mask1 = cv2.inRange(hsv, lower_red1, upper_red1)
-mask2 = cv2.inRange(hsv, lower_red2, upper_red2)
-mask = cv2.bitwise_or(mask1, mask2)
+    # 红色掩膜（查表一步得到，和原来转HSV再两次inRange结果一样）
+mask = RedMask(((lower_red1, upper_red1), (lower_red2, upper_red2)))(frame)
 cv2.imwrite('mask.png', mask)
 
 contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
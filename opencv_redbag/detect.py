@@ -0,0 +1,107 @@
+#检测引擎：掩膜 → 轮廓特征表（ContourTable），两种实现可以切换
+#  contours   : findContours + 逐轮廓特征（原来的做法）
+#  components : connectedComponentsWithStats 一次拿到所有色块的外接矩形/面积/重心
+#对比测速：python detect.py ../images
+
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from features import EMPTY, FEATURE_DTYPE, ContourTable, contour_features
+
+
+def contours_engine(mask):
+    """所有外轮廓，特征都是精确值"""
+    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    return contour_features(contours)
+
+
+def components_engine(mask, trace_area=27600):
+    """
+    8连通色块。x/y/w/h和findContours的外接矩形一样，重心是像素重心（和轮廓重心差不到1像素）。
+    周长只对外接矩形面积超过trace_area的色块算（在它的ROI里单独找一次轮廓），
+    这些色块的area也换成轮廓面积；其余色块的perimeter是nan、area是像素数、contours里是None。
+    外接矩形比trace_area还小的色块轮廓面积不可能超过trace_area，红包页面的判断用不到它们。
+    """
+    # 默认算法（Spaghetti）在这种稀疏掩膜上反而比Grana慢3倍，所以显式指定
+    n, labels, stats, centroids = cv2.connectedComponentsWithStatsWithAlgorithm(
+        mask, 8, cv2.CV_32S, cv2.CCL_GRANA)
+    if n <= 1:
+        return EMPTY
+    stats, centroids = stats[1:], centroids[1:]
+
+    rows = np.empty(n - 1, dtype=FEATURE_DTYPE)
+    rows['x'] = stats[:, cv2.CC_STAT_LEFT]
+    rows['y'] = stats[:, cv2.CC_STAT_TOP]
+    rows['w'] = stats[:, cv2.CC_STAT_WIDTH]
+    rows['h'] = stats[:, cv2.CC_STAT_HEIGHT]
+    rows['area'] = stats[:, cv2.CC_STAT_AREA]
+    rows['m00'] = stats[:, cv2.CC_STAT_AREA]
+    rows['cx'] = centroids[:, 0]
+    rows['cy'] = centroids[:, 1]
+    rows['perimeter'] = np.nan
+
+    contours = [None] * (n - 1)
+    big = np.flatnonzero(rows['w'].astype(np.int64) * rows['h'] > trace_area)
+    for i in big:
+        x, y, w, h = (int(v) for v in stats[i, :4])
+        roi = (labels[y:y + h, x:x + w] == i + 1).view(np.uint8)
+        found, _ = cv2.findContours(roi, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE, offset=(x, y))
+        contour = max(found, key=len)
+        traced = contour_features([contour]).rows[0]
+        rows['area'][i] = traced['area']
+        rows['perimeter'][i] = traced['perimeter']
+        contours[i] = contour
+    return ContourTable(contours, rows)
+
+
+ENGINES = {
+    'contours': contours_engine,
+    'components': components_engine,
+}
+
+
+def get_engine(name):
+    if name not in ENGINES:
+        raise ValueError(f"不认识的检测引擎: {name}（可选 {', '.join(ENGINES)}）")
+    return ENGINES[name]
+
+
+def size_filter(rows, width_lower, width_upper, height_lower, height_upper):
+    """外接矩形宽高都在范围内的行（布尔数组）"""
+    return ((width_lower <= rows['w']) & (rows['w'] <= width_upper) &
+            (height_lower <= rows['h']) & (rows['h'] <= height_upper))
+
+
+def benchmark(folder, repeat=50):
+    """在文件夹里的截图上比较两个引擎的耗时和找到的红包"""
+    from redmask import RedMask
+
+    # final manba.py 里1080p的红包尺寸范围
+    bounds = (150 * 0.8, 150 * 1.2, 230 * 0.8, 230 * 1.2)
+    red = RedMask()
+    for name in sorted(os.listdir(folder)):
+        if not name.lower().endswith(('.png', '.jpg', '.jpeg', '.bmp')):
+            continue
+        image = cv2.imdecode(np.fromfile(os.path.join(folder, name), dtype=np.uint8), cv2.IMREAD_COLOR)
+        if image is None:
+            continue
+        mask = red(image).copy()
+        line = [f"{name} ({image.shape[1]}x{image.shape[0]})"]
+        for engine_name, engine in ENGINES.items():
+            engine(mask)
+            start = time.perf_counter()
+            for _ in range(repeat):
+                table = engine(mask)
+            elapsed = (time.perf_counter() - start) / repeat
+            fit = np.flatnonzero(size_filter(table.rows, *bounds))
+            target = tuple(int(v) for v in table.rows[fit[0]][['cx', 'cy']].tolist()) if len(fit) else None
+            line.append(f"{engine_name} {elapsed * 1000:.2f} ms {len(table)}个 红包{target}")
+        print(' | '.join(line))
+
+
+if __name__ == '__main__':
+    benchmark(sys.argv[1] if len(sys.argv) > 1 else '../images')
@@ -0,0 +1,80 @@
+#脏区域检测：和上一帧比较，只把变化了的分块交给hsv转换和轮廓搜索
+#比较在隔step取样的小图上做，按tile大小分块，每块只看最大差值
+
+import cv2
+import numpy as np
+
+
+class ChangeGate:
+    """
+    update(raw) 返回这一帧变化了的矩形列表 [(x, y, w, h), ...]（原图坐标）。
+    返回空列表表示和上一帧一样，可以直接沿用上一帧的检测结果。
+    第一帧和分辨率变化时返回整幅图。
+    """
+
+    def __init__(self, tile=64, step=4, threshold=8):
+        self.tile = tile            # 分块大小（原图像素），最好是step的整数倍
+        self.step = step            # 隔多少像素取一个样
+        self.threshold = threshold  # 通道差值超过它才算变化，滤掉压缩/渲染的轻微抖动
+        self.shape = None
+        self.frames = 0
+        self.skipped = 0
+        self.dirty_pixels = 0
+        self.total_pixels = 0
+
+    def _reset(self, raw):
+        self.shape = raw.shape
+        height, width, channels = raw.shape
+        self.small_size = (-(-width // self.step), -(-height // self.step))
+        self.prev = self._downsample(raw, np.empty((self.small_size[1], self.small_size[0], channels), np.uint8))
+        self.cur = np.empty_like(self.prev)
+        self.diff = np.empty_like(self.prev)
+        ts = max(self.tile // self.step, 1)
+        self.row_starts = np.arange(0, self.small_size[1], ts)
+        # 列方向直接在 (h, w*通道) 上分块，省掉一次按通道求max
+        self.col_starts = np.arange(0, self.small_size[0], ts) * channels
+
+    def _downsample(self, raw, dst):
+        # 最近邻缩小就是隔step取样，比numpy的跨步拷贝快
+        return cv2.resize(raw, self.small_size, dst=dst, interpolation=cv2.INTER_NEAREST)
+
+    def update(self, raw):
+        self.frames += 1
+        height, width = raw.shape[:2]
+        self.total_pixels += height * width
+        if raw.shape != self.shape:
+            self._reset(raw)
+            self.dirty_pixels += height * width
+            return [(0, 0, width, height)]
+
+        self._downsample(raw, self.cur)
+        cv2.absdiff(self.cur, self.prev, dst=self.diff)
+
+        # 每个分块里的最大差值
+        flat = self.diff.reshape(self.diff.shape[0], -1)
+        tiles = np.maximum.reduceat(np.maximum.reduceat(flat, self.row_starts, axis=0),
+                                    self.col_starts, axis=1)
+        dirty = (tiles > self.threshold).astype(np.uint8)
+        if not dirty.any():
+            self.skipped += 1
+            return []
+
+        # 相邻的脏块合并成一个矩形，减少ROI数量
+        n, _, stats, _ = cv2.connectedComponentsWithStats(dirty, connectivity=8)
+        ts = max(self.tile // self.step, 1)
+        rects = []
+        for tx, ty, tw, th, _ in stats[1:n].tolist():
+            x, y = tx * self.tile, ty * self.tile
+            w = min((tx + tw) * self.tile, width) - x
+            h = min((ty + th) * self.tile, height) - y
+            rects.append((x, y, w, h))
+            self.dirty_pixels += w * h
+            # 参考帧只在重新处理过的分块更新，低于阈值的缓慢变化会累积到触发为止
+            rows = slice(ty * ts, (ty + th) * ts)
+            cols = slice(tx * ts, (tx + tw) * ts)
+            self.prev[rows, cols] = self.cur[rows, cols]
+        return rects
+
+    def report(self):
+        ratio = self.dirty_pixels / self.total_pixels if self.total_pixels else 0.0
+        return f"变化检测 {self.frames} 帧，跳过 {self.skipped} 帧，重新处理的像素占 {ratio * 100:.1f}%"
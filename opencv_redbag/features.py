@@ -0,0 +1,79 @@
+#每帧的轮廓特征表：外接矩形、面积、周长、重心一次性向量化算好，一行一个轮廓
+#算好以后只读，点击红包、判断红包页面、5秒检查阻塞都拿同一份，不会重复算也不会读到一半被改掉
+
+import numpy as np
+
+FEATURE_DTYPE = np.dtype([
+    ('x', np.int32), ('y', np.int32), ('w', np.int32), ('h', np.int32),   # 同cv2.boundingRect
+    ('area', np.float64),        # 同cv2.contourArea
+    ('perimeter', np.float64),   # 同cv2.arcLength(contour, True)
+    ('m00', np.float64),         # 同cv2.moments(contour)["m00"]
+    ('cx', np.float64), ('cy', np.float64),   # m10/m00, m01/m00；m00为0时是nan
+])
+
+
+class ContourTable:
+    """
+    一帧的轮廓特征（只读快照）。
+    rows是结构化数组，rows[i]对应contours[i]；可以按列取，如 table.rows['w']。
+    """
+
+    def __init__(self, contours, rows):
+        rows.flags.writeable = False
+        self.contours = tuple(contours)
+        self.rows = rows
+
+    def __len__(self):
+        return len(self.rows)
+
+    def largest_perimeter(self):
+        """周长最大的轮廓下标（并列取第一个，和原来的循环一样），没有轮廓返回None；没算周长(nan)的行跳过"""
+        perimeter = self.rows['perimeter']
+        if len(perimeter) == 0 or np.isnan(perimeter).all():
+            return None
+        return int(np.nanargmax(perimeter))
+
+
+EMPTY = ContourTable((), np.zeros(0, dtype=FEATURE_DTYPE))
+
+
+def contour_features(contours):
+    """把cv2.findContours的结果算成ContourTable，所有轮廓的点拼在一起用reduceat分段求和"""
+    if len(contours) == 0:
+        return EMPTY
+
+    counts = np.fromiter((len(c) for c in contours), dtype=np.intp, count=len(contours))
+    starts = np.zeros(len(contours), dtype=np.intp)
+    np.cumsum(counts[:-1], out=starts[1:])
+    pts = np.concatenate(contours).reshape(-1, 2).astype(np.float64)
+    x, y = pts[:, 0], pts[:, 1]
+
+    # 每个点连到同一轮廓里的下一个点，最后一个点连回第一个点（闭合）
+    nxt = np.arange(1, len(pts) + 1)
+    nxt[starts + counts - 1] = starts
+    xn, yn = x[nxt], y[nxt]
+
+    rows = np.empty(len(contours), dtype=FEATURE_DTYPE)
+    x0 = np.minimum.reduceat(x, starts)
+    y0 = np.minimum.reduceat(y, starts)
+    rows['x'] = x0
+    rows['y'] = y0
+    rows['w'] = np.maximum.reduceat(x, starts) - x0 + 1
+    rows['h'] = np.maximum.reduceat(y, starts) - y0 + 1
+
+    rows['perimeter'] = np.add.reduceat(np.hypot(xn - x, yn - y), starts)
+
+    # 格林公式：多边形的面积和一阶矩
+    cross = x * yn - xn * y
+    a2 = np.add.reduceat(cross, starts)
+    m10 = np.add.reduceat((x + xn) * cross, starts) / 6
+    m01 = np.add.reduceat((y + yn) * cross, starts) / 6
+    m00 = a2 / 2
+    rows['area'] = np.abs(m00)
+    # 和cv2.moments一样，面积太小就当作0
+    zero = np.abs(m00) <= np.finfo(np.float32).eps
+    rows['m00'] = np.where(zero, 0.0, np.abs(m00))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rows['cx'] = np.where(zero, np.nan, m10 / m00)
+        rows['cy'] = np.where(zero, np.nan, m01 / m00)
+    return ContourTable(contours, rows)
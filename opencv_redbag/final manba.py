@@ -2,139 +2,77 @@
 #vx红包改一下红包参数和筛选hsv的范围就行了(大概
 #仅供学习opencv使用，请勿以此牟利(我已经把红包散财回去了，论速度肯定不如真挂，但是连点器乱点进入小广告也避免了(
 
-import cv2
-import numpy as np
-import pyautogui
-import time
-from mss import mss
-from threading import Timer
+import sys
 
-# 红色hsv，保留未抢的红包，筛选抢过的红包
-lower_red1 = np.array([0, 133, 100])
-upper_red1 = np.array([2, 255, 255])
-lower_red2 = np.array([179, 100, 100])
-upper_red2 = np.array([180, 255, 255])
+from input_backend import MockBackend, make_backend
+from monitors import desktop_size, screen_workers, simulated_workers
+from pipeline import Pipeline
+from telemetry import Hud, Telemetry
+from verifier import TemplateVerifier
 
-#红包参数（分辨率不同要乘一个系数，1920*1080）
-target_width = 150
-target_height = 230
-width_lower_bound = target_width * 0.8
-width_upper_bound = target_width * 1.2
-height_lower_bound = target_height * 0.8
-height_upper_bound = target_height * 1.2
+# 红色hsv区间和红包参数（1920*1080、100%缩放下的值）在redbag.py里改，其他分辨率/缩放会按每块屏幕自动换算
 
-# 标志位
-sign = 0
-tick = 0
+# 检测引擎：'contours'（findContours）或 'components'（connectedComponentsWithStats），python detect.py ../images 可以对比
+detect_engine = 'contours'
 
-def contours_check(contours):
+# 模板校验：候选红包/红包页面再和images/里的截图比一次，像已领取红包的不点；不想要就改成None
+verifier = TemplateVerifier()
 
-    max_perimeter = 0
-    max_contour = None
-    area = 0
+# 点击用的输入后端：'auto'（本机能用的里面挑最快的）、'pyautogui'、'xtest'、'uinput'，python input_backend.py 可以对比
+# 带截图文件夹回放时不点真鼠标，一律用mock
+backend_name = 'auto'
 
-    # 遍历轮廓,最大周长
-    for contour in contours:
-        perimeter = cv2.arcLength(contour, True)
-        if perimeter > max_perimeter:
-            max_perimeter = perimeter
-            max_contour = contour
-            area = cv2.contourArea(max_contour)
+# 各阶段耗时统计（抓屏/变化检测/掩膜/轮廓/判断/状态机/点击的fps和p50/p95/p99）：
+#   None 关掉，一次计时都没有；'terminal' 在终端刷新一行；'window' 开一个opencv小窗口；'quiet' 只在退出时打印
+telemetry_hud = 'terminal'
+# 统计每隔10秒导出一次：'telemetry.csv'（追加）或 'telemetry.json'（覆盖），None不导出
+telemetry_export = None
+telemetry = Telemetry() if telemetry_hud is not None else None
 
-    # 周长（1080最小至少为1188.7,最大在2371）,面积大于27600
-    #print("area=",area)
-    #print("max_perimeter=",max_perimeter)
-    if max_contour is not None and 1180*0.9<=max_perimeter<=2371*1.1 and area > 27600:
-        #print("判定为通过")
-        return max_contour
-    else:
-        return False
+# 每块屏幕的检测在monitors.py的MonitorWorker里：
+#   变化检测 → 红色掩膜查表 → 轮廓特征表 → 找红包/红包页面 → 模板校验 → 红包页面状态机 → 换算成桌面坐标
+#cv2.imwrite('mask.png', worker.engine.red.mask)   调试用，看某块屏幕当前的掩膜
 
-def open_redbag(contours):
+def act(action):
+    """点击线程：模拟点击（坐标已经是整个桌面的坐标）"""
 
-    for contour in contours:
-        # 轮廓外接矩形
-        x, y, w, h = cv2.boundingRect(contour)
-        if width_lower_bound <= w <= width_upper_bound and height_lower_bound <= h <= height_upper_bound:
-            # 轮廓的矩
-            M = cv2.moments(contour)
-            if M["m00"] != 0:
-                # 红色区域中心坐标
-                cX = int(M["m10"] / M["m00"])
-                cY = int(M["m01"] / M["m00"])
-                # 在图像上绘制中心坐标点
-                cv2.circle(frame, (cX, cY), 5, (0, 255, 0), -1)
-                # 模拟点击红色区域的正中央
-                #pyautogui.moveTo(cX, cY)   #先移动再点吗？不赖。其实注释掉也没有任何影响，甚至更快（
-                pyautogui.click(cX, cY)
-                #print('cX:', cX, 'cY:', cY)
-                return True
-            else:
-                return False
-
-def close_redbag(contours):
-
-        x, y, w, h = cv2.boundingRect(contours)
-        #roi = mask[y:y + h, x:x + w]   检测识别用的roi，imshow
-        # 模拟鼠标点击匹配中心
-        pyautogui.click(x + 450, y + 20)
-        #print('X:', x + 450, 'Y:', y + 20)
-
-def check_obstruction(contours):    #检查阻塞
-
-    if np.any(contours_check(contours)):
-        close_redbag(contours_check(contours))
-
-def run_5ps():        #
-    check_obstruction(contours)
-    timer = Timer(5, run_5ps)   #每隔5秒检查一下是否被红包页面卡死
-    #print(counter)                    #测刷新率用
-    timer.start()
+    kind, (x, y) = action
+    #backend.move_to(x, y)   #先移动再点吗？不赖。其实注释掉也没有任何影响，甚至更快（
+    backend.click(x, y)
 
 #主函数
-#counter = 0
-while True:
-    global bool_red
-    bool_red = False
-
-    with mss() as sct:
-        sct_img = sct.grab(sct.monitors[1])
-        frame = np.array(sct_img)
-        frame = cv2.cvtColor(frame, cv2.COLOR_BGRA2BGR)
-        hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
-
-    # 红色掩膜
-    mask1 = cv2.inRange(hsv, lower_red1, upper_red1)
-    mask2 = cv2.inRange(hsv, lower_red2, upper_red2)
-    mask = cv2.bitwise_or(mask1, mask2)
-    #cv2.imwrite('mask.png', mask)
-
-    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-    cv2.drawContours(frame, contours, 0, (0, 255, 0), 2)
-    #cv2.imwrite('ft7.png', frame)
-    if tick == 0:
-        run_5ps()     #防止退出红包失败阻塞程序运行
-        tick = 1
-
-    if sign == 0:
-        bool_red = open_redbag(contours) #识别并点击红包
-
-    if bool_red is True and sign == 0: # 已经点击，应判断是否是红包
-        sign = 1
-        time.sleep(1)    #等待红包页面加载，可根据配置适当更改
-        #print("跳过一轮")
-        continue                       #刷新识别页面
-
-    elif sign == 1:
-        #print("开始判断红包")
-        if np.any(contours_check(contours)):  # 已判断是红包页面
-            #print("是红包")
-            #cv2.imwrite('frame.png', frame)
-            close_redbag(contours_check(contours))  #退出红包页面
-        else: #不是红包页面
-            sign = 0
-            #print("不是红包")
-    #counter += 1
-    # 按下q键退出循环
-    if cv2.waitKey(1) & 0xFF == ord('q'):
-        break
+# 不带参数：所有显示器同时抓；带参数：每个参数是一个截图文件夹，模拟一块屏幕（可以是不同分辨率）
+if len(sys.argv) > 1:
+    workers = simulated_workers(sys.argv[1:], detect_engine, verifier=verifier, telemetry=telemetry)
+    backend = MockBackend()
+else:
+    workers = screen_workers(detect_engine, verifier=verifier, telemetry=telemetry)
+    backend = make_backend(backend_name, screen=desktop_size(workers))   # uinput点绝对坐标要知道桌面大小
+# 每块屏幕各一个抓屏线程和检测线程，检测只处理最新的一帧；点击线程只有一个
+pipeline = Pipeline(None, None, act, telemetry=telemetry)
+for worker in workers:
+    pipeline.add_lane(worker.source, worker.detect, worker.name)
+hud = Hud(telemetry, telemetry_hud, telemetry_export) if telemetry is not None else None
+pipeline.start()
+
+try:
+    while not pipeline.wait(0.5):
+        if hud is not None:
+            hud.update()
+except KeyboardInterrupt:     # 按 Ctrl+C 退出
+    pass
+finally:
+    pipeline.stop()
+    if hud is not None:
+        hud.close()
+        print(telemetry.report())
+    print(pipeline.report())
+    for worker in workers:
+        worker.close()
+        print(worker.report())
+    if verifier is not None:
+        print(verifier.report())
+    print(backend.report())
+    backend.close()
+    if pipeline.error is not None:
+        print("出错了:", pipeline.error)
@@ -0,0 +1,410 @@
+#输入后端：点击、按键、滚轮统一走这里，final manba.py和Controller/Ps5ControllerForSweetGF2.py共用
+#  pyautogui : 原来的做法，哪里都能用，但每次调用自带PAUSE和不少开销
+#  xtest     : linux/X11下直接发XTest事件，和xdotool一样，但不用每次起进程（可选依赖：pip install python-xlib）
+#  uinput    : linux下建一个虚拟键鼠设备直接往内核写事件，wayland也能用（可选依赖：pip install evdev，需要/dev/uinput的权限）
+#  mock      : 不碰键鼠，只记下带时间戳的事件，测试和测速用
+#每个后端都会记下每种调用的耗时，python input_backend.py 可以比较本机能用的后端
+
+import argparse
+import sys
+import time
+from collections import deque
+
+import numpy as np
+
+
+class Backend:
+    """
+    后端的公共部分：调用方用 move_to / move_rel / click / mouse_down / mouse_up / key_down / key_up / press / scroll，
+    子类实现对应的 _move_to 等方法；每次调用的耗时按调用名记下来。
+    键名用pyautogui的写法（'ctrl'、'space'、'f6'、'up'……），鼠标键是 'left' / 'right' / 'middle'。
+    """
+
+    name = ''
+
+    def __init__(self, keep=1000):
+        self.samples = {}       # 调用名 -> 最近keep次的耗时（秒）
+        self.counts = {}
+        self.keep = keep
+
+    def _timed(self, call, fn, *args):
+        start = time.perf_counter()
+        fn(*args)
+        elapsed = time.perf_counter() - start
+        if call not in self.samples:
+            self.samples[call] = deque(maxlen=self.keep)
+            self.counts[call] = 0
+        self.samples[call].append(elapsed)
+        self.counts[call] += 1
+
+    def move_to(self, x, y):
+        self._timed('move_to', self._move_to, int(x), int(y))
+
+    def move_rel(self, dx, dy):
+        self._timed('move_rel', self._move_rel, int(dx), int(dy))
+
+    def click(self, x=None, y=None, button='left'):
+        self._timed('click', self._click, x, y, button)
+
+    def mouse_down(self, button='left'):
+        self._timed('mouse_down', self._button, button, True)
+
+    def mouse_up(self, button='left'):
+        self._timed('mouse_up', self._button, button, False)
+
+    def key_down(self, key):
+        self._timed('key_down', self._key_down, key)
+
+    def key_up(self, key):
+        self._timed('key_up', self._key_up, key)
+
+    def press(self, key):
+        self._timed('press', self._press, key)
+
+    def scroll(self, clicks):
+        """clicks为正往上滚，为负往下滚（和pyautogui.scroll一样）"""
+        self._timed('scroll', self._scroll, int(clicks))
+
+    def can_move_to(self):
+        """能不能移动到绝对坐标（move_to、click(x, y)）"""
+        return True
+
+    def _click(self, x, y, button):
+        if x is not None and y is not None:
+            self._move_to(int(x), int(y))
+        self._button(button, True)
+        self._button(button, False)
+
+    def _press(self, key):
+        self._key_down(key)
+        self._key_up(key)
+
+    def latency(self):
+        """每种调用的 次数、p50/p95/最大耗时（毫秒）"""
+        result = {}
+        for call, samples in self.samples.items():
+            ms = np.array(samples) * 1000
+            p50, p95 = np.percentile(ms, (50, 95))
+            result[call] = {'count': self.counts[call], 'p50': float(p50), 'p95': float(p95), 'max': float(ms.max())}
+        return result
+
+    def report(self):
+        lines = [f"输入后端 {self.name}："]
+        for call, st in self.latency().items():
+            lines.append(f"  {call:8s} {st['count']:6d} 次  p50 {st['p50']:.3f}  p95 {st['p95']:.3f}  最大 {st['max']:.3f} ms")
+        if len(lines) == 1:
+            lines.append("  还没有调用")
+        return '\n'.join(lines)
+
+    def close(self):
+        pass
+
+
+class PyAutoGUIBackend(Backend):
+    """pyautogui，PAUSE默认改成0（原来每次调用后都会sleep）"""
+
+    name = 'pyautogui'
+
+    def __init__(self, pause=0.0):
+        super().__init__()
+        import pyautogui
+        pyautogui.FAILSAFE = False    # 防止鼠标移到角落报错
+        pyautogui.PAUSE = pause
+        self.gui = pyautogui
+
+    def _move_to(self, x, y):
+        self.gui.moveTo(x, y)
+
+    def _move_rel(self, dx, dy):
+        self.gui.moveRel(dx, dy)
+
+    def _click(self, x, y, button):
+        self.gui.click(x, y, button=button)
+
+    def _button(self, button, down):
+        if down:
+            self.gui.mouseDown(button=button)
+        else:
+            self.gui.mouseUp(button=button)
+
+    def _key_down(self, key):
+        self.gui.keyDown(key)
+
+    def _key_up(self, key):
+        self.gui.keyUp(key)
+
+    def _press(self, key):
+        self.gui.press(key)
+
+    def _scroll(self, clicks):
+        self.gui.scroll(clicks)
+
+
+# pyautogui键名 → X11 keysym名 / linux输入事件码名，没列出来的按原样（字母、数字、f1~f12）
+XTEST_KEYS = {
+    'ctrl': 'Control_L', 'shift': 'Shift_L', 'alt': 'Alt_L', 'space': 'space', 'enter': 'Return',
+    'esc': 'Escape', 'tab': 'Tab', 'backspace': 'BackSpace', 'up': 'Up', 'down': 'Down',
+    'left': 'Left', 'right': 'Right',
+}
+UINPUT_KEYS = {
+    'ctrl': 'LEFTCTRL', 'shift': 'LEFTSHIFT', 'alt': 'LEFTALT', 'enter': 'ENTER', 'esc': 'ESC',
+}
+
+
+class XTestBackend(Backend):
+    """X11的XTest扩展，事件直接发给X服务器，每次调用后flush，不等回复"""
+
+    name = 'xtest'
+    BUTTONS = {'left': 1, 'middle': 2, 'right': 3}
+
+    def __init__(self, display=None):
+        super().__init__()
+        from Xlib import X, XK
+        from Xlib.display import Display
+        from Xlib.ext import xtest
+        self.X = X
+        self.XK = XK
+        self.xtest = xtest
+        self.display = Display(display)
+        if not self.display.has_extension('XTEST'):
+            raise RuntimeError("X服务器没有XTEST扩展")
+        self.keycodes = {}
+
+    def _keycode(self, key):
+        if key not in self.keycodes:
+            keysym = self.XK.string_to_keysym(XTEST_KEYS.get(key, key.upper() if len(key) > 1 else key))
+            keycode = self.display.keysym_to_keycode(keysym)
+            if not keycode:
+                raise ValueError(f"不认识的键: {key}")
+            self.keycodes[key] = keycode
+        return self.keycodes[key]
+
+    def _fake(self, event, detail=0, x=0, y=0):
+        self.xtest.fake_input(self.display, event, detail, x=x, y=y)
+        self.display.flush()
+
+    def _move_to(self, x, y):
+        self._fake(self.X.MotionNotify, 0, x, y)
+
+    def _move_rel(self, dx, dy):
+        self._fake(self.X.MotionNotify, 1, dx, dy)
+
+    def _button(self, button, down):
+        self._fake(self.X.ButtonPress if down else self.X.ButtonRelease, self.BUTTONS.get(button, button))
+
+    def _key_down(self, key):
+        self._fake(self.X.KeyPress, self._keycode(key))
+
+    def _key_up(self, key):
+        self._fake(self.X.KeyRelease, self._keycode(key))
+
+    def _scroll(self, clicks):
+        button = 4 if clicks > 0 else 5     # X11里滚轮是4号（上）/5号（下）键
+        for _ in range(abs(clicks)):
+            self._button(button, True)
+            self._button(button, False)
+
+    def close(self):
+        self.display.close()
+
+
+class UInputBackend(Backend):
+    """
+    /dev/uinput上的两个虚拟设备：相对移动的键鼠（移动、按键、滚轮），和只管绝对坐标的指针（move_to/click(x, y)）。
+    绝对坐标设备需要知道屏幕大小，不给就不能move_to。
+    """
+
+    name = 'uinput'
+    BUTTONS = {'left': 'BTN_LEFT', 'middle': 'BTN_MIDDLE', 'right': 'BTN_RIGHT'}
+
+    def __init__(self, screen=None):
+        super().__init__()
+        from evdev import AbsInfo, UInput, ecodes
+        self.ecodes = ecodes
+        keys = [code for name, code in ecodes.ecodes.items() if name.startswith('KEY_') and 0 < code < 0x100]
+        buttons = [ecodes.BTN_LEFT, ecodes.BTN_RIGHT, ecodes.BTN_MIDDLE]
+        self.device = UInput({ecodes.EV_KEY: keys + buttons,
+                              ecodes.EV_REL: [ecodes.REL_X, ecodes.REL_Y, ecodes.REL_WHEEL]},
+                             name='redbag-input')
+        self.pointer = None
+        if screen is not None:
+            width, height = screen
+            self.pointer = UInput({ecodes.EV_KEY: buttons,
+                                   ecodes.EV_ABS: [(ecodes.ABS_X, AbsInfo(0, 0, width - 1, 0, 0, 0)),
+                                                   (ecodes.ABS_Y, AbsInfo(0, 0, height - 1, 0, 0, 0))]},
+                                  name='redbag-pointer')
+
+    def _code(self, key):
+        name = 'KEY_' + UINPUT_KEYS.get(key, key).upper()
+        if name not in self.ecodes.ecodes:
+            raise ValueError(f"不认识的键: {key}")
+        return self.ecodes.ecodes[name]
+
+    def can_move_to(self):
+        return self.pointer is not None
+
+    def _move_to(self, x, y):
+        if self.pointer is None:
+            raise RuntimeError("uinput后端没有给屏幕大小，不能移动到绝对坐标")
+        self.pointer.write(self.ecodes.EV_ABS, self.ecodes.ABS_X, x)
+        self.pointer.write(self.ecodes.EV_ABS, self.ecodes.ABS_Y, y)
+        self.pointer.syn()
+
+    def _move_rel(self, dx, dy):
+        if dx:
+            self.device.write(self.ecodes.EV_REL, self.ecodes.REL_X, dx)
+        if dy:
+            self.device.write(self.ecodes.EV_REL, self.ecodes.REL_Y, dy)
+        self.device.syn()
+
+    def _button(self, button, down):
+        self.device.write(self.ecodes.EV_KEY, self.ecodes.ecodes[self.BUTTONS[button]], int(down))
+        self.device.syn()
+
+    def _key_down(self, key):
+        self.device.write(self.ecodes.EV_KEY, self._code(key), 1)
+        self.device.syn()
+
+    def _key_up(self, key):
+        self.device.write(self.ecodes.EV_KEY, self._code(key), 0)
+        self.device.syn()
+
+    def _scroll(self, clicks):
+        self.device.write(self.ecodes.EV_REL, self.ecodes.REL_WHEEL, clicks)
+        self.device.syn()
+
+    def close(self):
+        self.device.close()
+        if self.pointer is not None:
+            self.pointer.close()
+
+
+class MockBackend(Backend):
+    """不碰键鼠，events里按顺序记下 (时间, 调用名, 参数)；pointer是模拟出来的鼠标位置；clock可以换成虚拟时间"""
+
+    name = 'mock'
+
+    def __init__(self, clock=time.perf_counter):
+        super().__init__()
+        self.clock = clock
+        self.events = []
+        self.pointer = (0, 0)
+        self.held = set()
+
+    def _record(self, call, *args):
+        self.events.append((self.clock(), call, args))
+
+    def _move_to(self, x, y):
+        self.pointer = (x, y)
+        self._record('move_to', x, y)
+
+    def _move_rel(self, dx, dy):
+        self.pointer = (self.pointer[0] + dx, self.pointer[1] + dy)
+        self._record('move_rel', dx, dy)
+
+    def _click(self, x, y, button):
+        if x is not None and y is not None:
+            self.pointer = (int(x), int(y))
+        self._record('click', self.pointer, button)
+
+    def _button(self, button, down):
+        self._record('mouse_down' if down else 'mouse_up', button)
+
+    def _key_down(self, key):
+        self.held.add(key)
+        self._record('key_down', key)
+
+    def _key_up(self, key):
+        self.held.discard(key)
+        self._record('key_up', key)
+
+    def _press(self, key):
+        self._record('press', key)
+
+    def _scroll(self, clicks):
+        self._record('scroll', clicks)
+
+    def calls(self, call):
+        """某一种调用的所有参数，如 calls('click') → [((x, y), 'left'), ...]"""
+        return [args for _, name, args in self.events if name == call]
+
+
+BACKENDS = {
+    'pyautogui': PyAutoGUIBackend,
+    'xtest': XTestBackend,
+    'uinput': UInputBackend,
+    'mock': MockBackend,
+}
+
+# auto时按这个顺序试，linux下的两个直连后端在前
+AUTO_ORDER = ('uinput', 'xtest', 'pyautogui') if sys.platform.startswith('linux') else ('pyautogui',)
+
+
+def make_backend(name='auto', screen=None):
+    """
+    按名字建后端；screen=(宽, 高)只有uinput用得到（绝对坐标）。
+    'auto'：本机能用、能移动到绝对坐标的后端里挑鼠标移动最快的一个（uinput不给screen就不参加）。
+    """
+    if name == 'auto':
+        return fastest_backend(screen=screen)
+    if name not in BACKENDS:
+        raise ValueError(f"不认识的输入后端: {name}（可选 auto, {', '.join(BACKENDS)}）")
+    return BACKENDS[name](screen) if name == 'uinput' else BACKENDS[name]()
+
+
+def available_backends(names=AUTO_ORDER, screen=None):
+    """能建起来的后端 {名字: 实例}，缺库、没权限、没有X服务器的跳过"""
+    backends = {}
+    for name in names:
+        try:
+            backends[name] = make_backend(name, screen)
+        except Exception as e:    # ImportError、PermissionError、X连不上……
+            print(f"输入后端 {name} 不能用: {e}")
+    return backends
+
+
+def measure(backend, trials=100):
+    """
+    鼠标左右来回挪1像素，一共trials次，返回move_rel耗时的中位数（秒）。
+    不用move_rel(0, 0)：有的后端遇到0直接跳过（uinput只发一个syn），量不出真正发事件的开销。
+    """
+    for i in range(trials):
+        backend.move_rel(1 if i % 2 == 0 else -1, 0)
+    if trials % 2:
+        backend.move_rel(-1, 0)
+    return float(np.median(backend.samples['move_rel']))
+
+
+def fastest_backend(names=AUTO_ORDER, trials=100, screen=None):
+    backends = available_backends(names, screen)
+    for name in list(backends):
+        if not backends[name].can_move_to():
+            print(f"输入后端 {name} 不能移动到绝对坐标，不参加auto")
+            backends.pop(name).close()
+    if not backends:
+        raise RuntimeError("没有能用的输入后端")
+    timings = {name: measure(backend, trials) for name, backend in backends.items()}
+    best = min(timings, key=timings.get)
+    for name, backend in backends.items():
+        if name != best:
+            backend.close()
+    chosen = backends[best]
+    chosen.samples.clear()
+    chosen.counts.clear()
+    return chosen
+
+
+def main():
+    parser = argparse.ArgumentParser(description='比较本机能用的输入后端每次调用的耗时（鼠标左右来回挪1像素）')
+    parser.add_argument('--trials', type=int, default=1000)
+    parser.add_argument('--backends', nargs='*', default=list(AUTO_ORDER) + ['mock'], choices=sorted(BACKENDS))
+    args = parser.parse_args()
+
+    for name, backend in available_backends(args.backends).items():
+        median = measure(backend, args.trials)
+        print(f"{name:10s} move_rel(±1, 0) 中位 {median * 1e6:8.1f} us")
+        backend.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+#多显示器：每个显示器一个检测worker（自己的变化检测、掩膜、轮廓、红包页面状态机），
+#红包尺寸按显示器的DPI（拿不到就按分辨率）缩放，点击坐标换算成整个桌面的坐标
+#没有多个屏幕时可以用几个截图文件夹模拟，每个文件夹一块屏，从左到右排开
+
+import ctypes
+import functools
+import sys
+import time
+
+from capture import CaptureEngine, DirectorySource, MssSource
+from detect import components_engine, get_engine
+from dirty import ChangeGate
+from features import EMPTY
+from popup import CLICKED, IDLE, POPUP_OPEN, PopupMachine
+from redbag import Geometry, lower_red1, lower_red2, observe, upper_red1, upper_red2
+
+
+def monitor_dpi(left, top):
+    """windows下取显示器的有效DPI（100%缩放是96），其他系统或取不到时返回None"""
+    if sys.platform != 'win32':
+        return None
+    try:
+        from ctypes import wintypes
+        point = wintypes.POINT(left + 1, top + 1)
+        hmonitor = ctypes.windll.user32.MonitorFromPoint(point, 2)   # MONITOR_DEFAULTTONEAREST
+        dpi_x, dpi_y = ctypes.c_uint(), ctypes.c_uint()
+        if ctypes.windll.shcore.GetDpiForMonitor(hmonitor, 0, ctypes.byref(dpi_x), ctypes.byref(dpi_y)) != 0:
+            return None
+        return dpi_y.value
+    except (AttributeError, OSError):
+        return None
+
+
+def monitor_scale(height, dpi=None):
+    """红包参数的缩放系数：有DPI就按DPI（QQ界面跟着系统缩放走），没有就按高度和1080的比例"""
+    if dpi:
+        return dpi / 96
+    return height / 1080
+
+
+class MonitorWorker:
+    """一块屏幕的检测：detect(raw) 返回桌面坐标下的点击 (类型, (x, y))，没有就返回None"""
+
+    def __init__(self, name, source, left, top, scale, engine_name='contours', verifier=None, telemetry=None):
+        self.name = name
+        self.source = source
+        self.left = left
+        self.top = top
+        self.geometry = Geometry(scale)
+        self.engine = CaptureEngine(source, lower_red1, upper_red1, lower_red2, upper_red2)
+        self.gate = ChangeGate()
+        if engine_name == 'components':
+            # 需要算周长的色块门槛也跟着缩放
+            self.find_blobs = functools.partial(components_engine, trace_area=self.geometry.area_lower_bound)
+        else:
+            self.find_blobs = get_engine(engine_name)
+        self.popup = PopupMachine()
+        self.verifier = verifier   # verifier.TemplateVerifier，None就不做模板校验；几块屏幕可以共用一个
+        self.features = EMPTY   # 这块屏幕当前帧的轮廓特征表
+        self.seen = (None, None)   # 当前帧的 (红包中心, 红包页面关闭按钮)
+        self.telemetry = telemetry   # telemetry.Telemetry，给了就换成分阶段计时的detect
+        if telemetry is not None:
+            self.stage = {stage: f'{stage}[{name}]' for stage in
+                          ('gate', 'mask', 'contours', 'observe', 'popup', 'popup_open', 'popup_close')}
+            self.detect = self._detect_timed
+
+    def detect(self, raw):
+        # 只处理和上一帧相比变化了的区域，画面没变就沿用上一帧的轮廓和判断（模板校验也不用重做）
+        rects = self.gate.update(raw)
+        if rects:
+            _, mask = self.engine.process(raw, rects)
+            self.features = self.find_blobs(mask)
+            self.seen = observe(self.features, self.geometry, raw, self.verifier)
+
+        target, close = self.seen
+        action = self.popup.step(time.perf_counter(), target, close)
+        if action is None:
+            return None
+        kind, (x, y) = action
+        return kind, (x + self.left, y + self.top)   # 换算成桌面坐标
+
+    def _detect_timed(self, raw):
+        """和detect一样，每一步都记进telemetry；点开→弹出、点开→关闭走完一轮时也记一次"""
+        telemetry, stage = self.telemetry, self.stage
+        t = time.perf_counter()
+        rects = self.gate.update(raw)
+        t = telemetry.add(stage['gate'], t)
+        if rects:
+            _, mask = self.engine.process(raw, rects)
+            t = telemetry.add(stage['mask'], t)
+            self.features = self.find_blobs(mask)
+            t = telemetry.add(stage['contours'], t)
+            self.seen = observe(self.features, self.geometry, raw, self.verifier)
+            t = telemetry.add(stage['observe'], t)
+
+        target, close = self.seen
+        cycles = len(self.popup.cycles)
+        action = self.popup.step(t, target, close)
+        telemetry.add(stage['popup'], t)
+        if len(self.popup.cycles) != cycles:
+            cycle = self.popup.cycles[-1]
+            if CLICKED in cycle and POPUP_OPEN in cycle:
+                telemetry.add_duration(stage['popup_open'], cycle[POPUP_OPEN] - cycle[CLICKED])
+                telemetry.add_duration(stage['popup_close'], cycle[IDLE] - cycle[CLICKED])
+        if action is None:
+            return None
+        kind, (x, y) = action
+        return kind, (x + self.left, y + self.top)
+
+    def report(self):
+        return (f"屏幕{self.name} ({self.left},{self.top}) 缩放 {self.geometry.scale:.2f}：\n"
+                f"  {self.gate.report()}\n  {self.popup.report()}")
+
+    def close(self):
+        self.engine.close()
+
+
+def screen_workers(engine_name='contours', scale=None, verifier=None, telemetry=None):
+    """每个真实显示器一个worker（mss.monitors[1:]）；scale给了就所有屏幕都用它"""
+    from mss import mss
+    with mss() as sct:
+        count = len(sct.monitors) - 1
+    workers = []
+    for index in range(1, count + 1):
+        source = MssSource(index)
+        s = scale or monitor_scale(source.height, monitor_dpi(source.left, source.top))
+        workers.append(MonitorWorker(str(index), source, source.left, source.top, s, engine_name, verifier, telemetry))
+    return workers
+
+
+def desktop_size(workers):
+    """几块屏幕拼起来的桌面大小 (宽, 高)，从桌面坐标原点算到最右/最下边，uinput的绝对坐标要用"""
+    return (max(w.left + w.source.width for w in workers),
+            max(w.top + w.source.height for w in workers))
+
+
+def simulated_workers(folders, engine_name='contours', scale=None, fps=60, verifier=None, telemetry=None):
+    """每个截图文件夹模拟一块屏幕，按第一张图的大小从左到右排开，顶边对齐"""
+    workers = []
+    left = 0
+    for index, folder in enumerate(folders, 1):
+        source = DirectorySource(folder, fps=fps)
+        s = scale or monitor_scale(source.height)
+        workers.append(MonitorWorker(str(index), source, left, 0, s, engine_name, verifier, telemetry))
+        left += source.width
+    return workers
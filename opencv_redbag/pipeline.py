@@ -0,0 +1,176 @@
+#抓屏 / 检测 / 点击 三个线程的流水线，线程之间用丢旧帧的有界队列连接
+#检测永远处理最新的一帧，点击再慢也不会挡住抓屏
+
+import functools
+import threading
+import time
+from collections import deque
+
+
+class DropOldestQueue:
+    """有界队列，满了以后put会挤掉最旧的元素并计数"""
+
+    def __init__(self, maxsize):
+        self.items = deque(maxlen=maxsize)
+        self.cond = threading.Condition()
+        self.put_count = 0
+        self.dropped = 0
+
+    def put(self, item):
+        with self.cond:
+            if len(self.items) == self.items.maxlen:
+                self.dropped += 1
+            self.items.append(item)
+            self.put_count += 1
+            self.cond.notify()
+
+    def get(self, timeout=None):
+        """取最旧的一个元素，超时返回None"""
+        with self.cond:
+            if not self.items and not self.cond.wait_for(lambda: self.items, timeout):
+                return None
+            return self.items.popleft()
+
+    def clear(self):
+        with self.cond:
+            self.items.clear()
+
+    def depth(self):
+        return len(self.items)
+
+
+class Pipeline:
+    """
+    capture线程：source.grab() → frames队列
+    detect线程： detect(raw) → 返回值不是None就放进actions队列
+    act线程：    act(action)
+
+    frames队列默认只留1帧，检测跟不上时旧帧直接丢掉。
+    多个屏幕时用add_lane再加几组 capture/detect 线程，点击线程只有一个，大家共用。
+    给了telemetry（telemetry.Telemetry）就把抓屏和点击的每次耗时记进去，检测里面的细分阶段由detect自己记。
+    """
+
+    def __init__(self, source, detect, act, frame_queue=1, action_queue=4, telemetry=None):
+        self.act = act
+        self.telemetry = telemetry
+        self.frame_queue = frame_queue
+        self.actions = DropOldestQueue(action_queue)
+        self.lanes = []
+        self.stop_event = threading.Event()
+        self.error = None
+        self.counts = {}
+        self.busy = {}
+        self.inputs = {}      # 每个阶段的输入队列
+        self.threads = []
+        self.started = None
+        self._add_stage('act', self.actions)
+        if source is not None:
+            self.add_lane(source, detect)
+
+    def _add_stage(self, name, queue=None):
+        self.counts[name] = 0
+        self.busy[name] = 0.0
+        if queue is not None:
+            self.inputs[name] = queue
+
+    def add_lane(self, source, detect, name=''):
+        """再加一组 抓屏 → 检测（在start之前调用）"""
+        frames = DropOldestQueue(self.frame_queue)
+        suffix = f'[{name}]' if name else ''
+        self.lanes.append((suffix, source, detect, frames))
+        self._add_stage('capture' + suffix)
+        self._add_stage('detect' + suffix, frames)
+
+    def _run(self, name, step):
+        """
+        线程主体：循环执行step直到stop；step异常会记下来并停掉整条流水线。
+        step返回这次干活的开始时间（不含等队列的时间），没拿到东西返回None。
+        """
+        telemetry = self.telemetry
+        try:
+            while not self.stop_event.is_set():
+                start = step()
+                if start is not None:
+                    self.counts[name] += 1
+                    if telemetry is not None:
+                        self.busy[name] += telemetry.add(name, start) - start
+                    else:
+                        self.busy[name] += time.perf_counter() - start
+        except StopIteration:
+            self.stop_event.set()
+        except Exception as e:
+            self.error = e
+            self.stop_event.set()
+
+    def _capture_step(self, source, frames):
+        start = time.perf_counter()
+        frames.put(source.grab())
+        return start
+
+    def _detect_step(self, detect, frames):
+        raw = frames.get(timeout=0.1)
+        if raw is None:
+            return None
+        start = time.perf_counter()
+        action = detect(raw)
+        if action is not None:
+            self.actions.put(action)
+        return start
+
+    def _act_step(self):
+        action = self.actions.get(timeout=0.1)
+        if action is None:
+            return None
+        start = time.perf_counter()
+        self.act(action)
+        return start
+
+    def _start_thread(self, name, step):
+        thread = threading.Thread(target=self._run, args=(name, step), name=name, daemon=True)
+        thread.start()
+        self.threads.append(thread)
+
+    def start(self):
+        self.started = time.perf_counter()
+        for suffix, source, detect, frames in self.lanes:
+            self._start_thread('capture' + suffix, functools.partial(self._capture_step, source, frames))
+            self._start_thread('detect' + suffix, functools.partial(self._detect_step, detect, frames))
+        self._start_thread('act', self._act_step)
+
+    def stop(self, timeout=2):
+        self.stop_event.set()
+        for thread in self.threads:
+            thread.join(timeout)
+
+    def alive(self):
+        return not self.stop_event.is_set()
+
+    def wait(self, timeout=None):
+        """阻塞到流水线停下（源播完/出错/stop），返回是否已停下"""
+        return self.stop_event.wait(timeout)
+
+    def stats(self):
+        """各阶段的处理数、平均耗时，以及输入队列的深度和丢弃数"""
+        elapsed = time.perf_counter() - self.started if self.started else 0
+        result = {}
+        names = [n for n in self.counts if n != 'act'] + ['act']
+        for name in names:
+            count = self.counts[name]
+            result[name] = {
+                'count': count,
+                'fps': count / elapsed if elapsed > 0 else 0.0,
+                'avg_ms': self.busy[name] / count * 1000 if count else 0.0,
+            }
+            if name in self.inputs:
+                queue = self.inputs[name]
+                result[name].update(depth=queue.depth(), dropped=queue.dropped)
+        return result
+
+    def report(self):
+        lines = []
+        for name, st in self.stats().items():
+            line = f"{name:12s} {st['count']:7d} 次 {st['fps']:6.1f}/s 平均 {st['avg_ms']:6.2f} ms"
+            if 'depth' in st:
+                line += f" 输入队列 {st['depth']} 丢弃 {st['dropped']}"
+            lines.append(line)
+        return '\n'.join(lines)
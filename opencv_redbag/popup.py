@@ -0,0 +1,140 @@
+#红包页面状态机：idle → clicked → popup_open → closing → idle
+#每一帧把"看到的红包中心"和"红包页面关闭按钮"喂进来，状态机决定点哪里，不再用sign标志和固定的sleep
+#看到红包页面就立刻关，每个状态都有超时；状态切换的时间都记下来，可以算点开到关闭最快要多久
+
+import numpy as np
+
+IDLE = 'idle'
+CLICKED = 'clicked'          # 已经点了红包，等红包页面弹出来
+POPUP_OPEN = 'popup_open'    # 看到红包页面了
+CLOSING = 'closing'          # 已经点了关闭，等红包页面消失
+
+
+class PopupMachine:
+    """
+    step(now, target, close) 每帧调用一次：
+      target: 画面里未领取红包的中心 (x, y)，没有就是None
+      close:  红包页面关闭按钮的坐标 (x, y)，没有红包页面就是None
+    返回要点击的 ('open' 或 'close', (x, y))，不用点就返回None。
+    now由调用方传入（time.perf_counter()），测试时可以直接给脚本里的时间。
+    """
+
+    def __init__(self, popup_timeout=1.5, close_retry=0.5, closing_timeout=3.0, stuck_timeout=2.0):
+        self.popup_timeout = popup_timeout      # 点了红包这么久还没弹出页面就放弃（不是红包/没点中）
+        self.close_retry = close_retry          # 点了关闭这么久页面还在就再点一次
+        self.closing_timeout = closing_timeout  # 一直关不掉就回到idle，交给卡死检查
+        self.stuck_timeout = stuck_timeout      # idle时红包页面挡着超过这么久就关掉（原来5秒一次的run_5ps）
+        self.state = IDLE
+        self.since = None          # 进入当前状态的时间
+        self.last_close = None     # 上一次点关闭的时间
+        self.popup_since = None    # idle状态下红包页面从什么时候开始出现
+        self.transitions = []      # (原状态, 新状态, 时间, 在原状态停留的秒数)
+        self.cycle = None          # 当前这一轮各状态的进入时间
+        self.cycles = []           # 走完的每一轮
+
+    def _goto(self, state, now):
+        stay = now - self.since if self.since is not None else 0.0
+        self.transitions.append((self.state, state, now, stay))
+        self.state = state
+        self.since = now
+        if self.cycle is not None:
+            self.cycle.setdefault(state, now)
+            if state == IDLE:
+                self.cycles.append(self.cycle)
+                self.cycle = None
+
+    def _close(self, close, now):
+        self.last_close = now
+        return 'close', close
+
+    def step(self, now, target, close):
+        if self.since is None:
+            self.since = now
+
+        if self.state == IDLE:
+            if close is not None:
+                # 不是我们点开的红包页面：挡着太久就关掉
+                if self.popup_since is None:
+                    self.popup_since = now
+                if now - self.popup_since >= self.stuck_timeout:
+                    self.popup_since = None
+                    self._goto(CLOSING, now)
+                    return self._close(close, now)
+                return None
+            self.popup_since = None
+            if target is not None:
+                self.cycle = {}
+                self._goto(CLICKED, now)
+                return 'open', target
+            return None
+
+        if self.state == CLICKED:
+            if close is not None:
+                self._goto(POPUP_OPEN, now)
+                self._goto(CLOSING, now)     # 看到就关，不再等固定的1秒
+                return self._close(close, now)
+            if now - self.since >= self.popup_timeout:
+                self._goto(IDLE, now)
+            return None
+
+        if self.state == CLOSING:
+            if close is None:
+                self._goto(IDLE, now)
+                return None
+            if now - self.since >= self.closing_timeout:
+                self._goto(IDLE, now)
+                return None
+            if now - self.last_close >= self.close_retry:
+                return self._close(close, now)
+            return None
+
+        return None
+
+    def latencies(self):
+        """
+        每一轮完整走到关闭的耗时（秒）：
+          popup: 点红包 → 看到红包页面
+          close: 点红包 → 页面关掉（回到idle）
+        """
+        popup, close = [], []
+        for cycle in self.cycles:
+            if CLICKED in cycle and POPUP_OPEN in cycle:
+                popup.append(cycle[POPUP_OPEN] - cycle[CLICKED])
+                close.append(cycle[IDLE] - cycle[CLICKED])
+        return {'popup': popup, 'close': close}
+
+    def report(self):
+        lat = self.latencies()
+        if not lat['close']:
+            return f"红包页面状态机：{len(self.cycles)} 轮，没有完整走完点开→关闭的"
+        popup, close = np.array(lat['popup']) * 1000, np.array(lat['close']) * 1000
+        return (f"红包页面状态机：{len(close)} 次点开→关闭，"
+                f"弹出 最快 {popup.min():.0f} ms 中位 {np.median(popup):.0f} ms，"
+                f"关闭 最快 {close.min():.0f} ms 中位 {np.median(close):.0f} ms")
+
+
+def run_script(machine, script):
+    """
+    按脚本喂帧：script是 [(时间, target, close), ...]，返回 [(时间, 动作), ...]。
+    用来在没有屏幕的时候检查状态机。
+    """
+    actions = []
+    for now, target, close in script:
+        action = machine.step(now, target, close)
+        if action is not None:
+            actions.append((now, action))
+    return actions
+
+
+if __name__ == '__main__':
+    # 点红包 → 0.3秒后页面弹出 → 关闭 → 页面消失；然后点了一个不是红包的东西
+    packet, button = (960, 540), (1170, 170)
+    script = [(0.00, packet, None), (0.10, packet, None), (0.30, None, button),
+              (0.35, None, button), (0.40, None, None),
+              (1.00, packet, None), (1.50, packet, None), (2.60, packet, None)]
+    machine = PopupMachine()
+    for now, action in run_script(machine, script):
+        print(f"{now:.2f}s {action}")
+    for old, new, now, stay in machine.transitions:
+        print(f"{now:.2f}s {old} → {new}（停留 {stay * 1000:.0f} ms）")
+    print(machine.report())
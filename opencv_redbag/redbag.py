@@ -0,0 +1,111 @@
+#红包识别的参数和判断：给定一帧的轮廓特征表，找未领取的红包和红包页面
+#final manba.py（实时）和replay.py（离线回放）共用这一份
+
+import numpy as np
+
+from detect import size_filter
+
+# 红色hsv，保留未抢的红包，筛选抢过的红包
+lower_red1 = np.array([0, 133, 100])
+upper_red1 = np.array([2, 255, 255])
+lower_red2 = np.array([179, 100, 100])
+upper_red2 = np.array([180, 255, 255])
+
+#红包参数（分辨率不同要乘一个系数，1920*1080）
+target_width = 150
+target_height = 230
+width_lower_bound = target_width * 0.8
+width_upper_bound = target_width * 1.2
+height_lower_bound = target_height * 0.8
+height_upper_bound = target_height * 1.2
+
+# 红包页面：周长（1080最小至少为1188.7,最大在2371）,面积大于27600；关闭按钮在页面左上角右边450、下面20
+perimeter_lower_bound = 1180 * 0.9
+perimeter_upper_bound = 2371 * 1.1
+area_lower_bound = 27600
+close_offset = (450, 20)
+
+
+class Geometry:
+    """
+    上面这些像素尺寸按比例缩放后的一份。scale=1 对应1920*1080、100%缩放；
+    长度乘scale，面积乘scale的平方。
+    """
+
+    def __init__(self, scale=1.0):
+        self.scale = scale
+        self.width_lower_bound = width_lower_bound * scale
+        self.width_upper_bound = width_upper_bound * scale
+        self.height_lower_bound = height_lower_bound * scale
+        self.height_upper_bound = height_upper_bound * scale
+        self.perimeter_lower_bound = perimeter_lower_bound * scale
+        self.perimeter_upper_bound = perimeter_upper_bound * scale
+        self.area_lower_bound = area_lower_bound * scale * scale
+        self.close_offset = (round(close_offset[0] * scale), round(close_offset[1] * scale))
+
+
+DEFAULT_GEOMETRY = Geometry()
+
+
+def contours_check(features, geometry=DEFAULT_GEOMETRY):
+    """判断是不是红包页面：是就返回周长最大的那一行特征，否则返回False"""
+
+    # 最大周长
+    i = features.largest_perimeter()
+    if i is None:
+        return False
+    row = features.rows[i]
+
+    #print("area=",row['area'])
+    #print("max_perimeter=",row['perimeter'])
+    if (geometry.perimeter_lower_bound <= row['perimeter'] <= geometry.perimeter_upper_bound
+            and row['area'] > geometry.area_lower_bound):
+        #print("判定为通过")
+        return row
+    else:
+        return False
+
+def open_redbag_candidates(features, geometry=DEFAULT_GEOMETRY):
+    """外接矩形大小符合红包的所有行"""
+    fit = np.flatnonzero(size_filter(features.rows, geometry.width_lower_bound, geometry.width_upper_bound,
+                                     geometry.height_lower_bound, geometry.height_upper_bound))
+    return features.rows[fit]
+
+def open_redbag(features, geometry=DEFAULT_GEOMETRY, image=None, verifier=None):
+    """
+    找到未领取的红包就返回它的中心坐标，否则返回None。
+    给了verifier和这一帧的image时，候选还要过一遍模板校验，像已领取红包的跳过。
+    """
+
+    # 外接矩形大小符合的第一个轮廓
+    for row in open_redbag_candidates(features, geometry):
+        if row['m00'] == 0:
+            return None
+        if verifier is not None:
+            rect = (int(row['x']), int(row['y']), int(row['w']), int(row['h']))
+            if not verifier.is_unclaimed(image, rect, geometry.scale):
+                continue
+        # 红色区域中心坐标
+        cX = int(row['cx'])
+        cY = int(row['cy'])
+        #print('cX:', cX, 'cY:', cY)
+        return cX, cY
+    return None
+
+def close_redbag(row, geometry=DEFAULT_GEOMETRY):
+    """红包页面的关闭按钮坐标"""
+
+    x, y = int(row['x']), int(row['y'])
+    #roi = mask[y:y + h, x:x + w]   检测识别用的roi，imshow
+    dx, dy = geometry.close_offset
+    #print('X:', x + dx, 'Y:', y + dy)
+    return x + dx, y + dy
+
+
+def observe(features, geometry=DEFAULT_GEOMETRY, image=None, verifier=None):
+    """一帧里看到了什么：(红包中心 或 None, 红包页面关闭按钮 或 None)；给了verifier就用模板再确认一次"""
+    row = contours_check(features, geometry)
+    close = close_redbag(row, geometry) if row is not False else None
+    if close is not None and verifier is not None and not verifier.is_popup(image, close, geometry.scale):
+        close = None
+    return open_redbag(features, geometry, image, verifier), close
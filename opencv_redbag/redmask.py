@@ -0,0 +1,159 @@
+#红色掩膜：启动时把 BGR→"是不是红色" 预先算成一张 2^24 的查找表，之后每帧直接用BGRA缓冲区查表
+#省掉 BGRA→BGR→HSV 两次全帧转换、两次inRange和一次bitwise_or
+#校验：python redmask.py ../images  （和原来两段inRange的结果逐像素比较）
+
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+# final manba.py / dan.py / test.py 用的红色区间
+RED_BANDS = (
+    (np.array([0, 133, 100]), np.array([2, 255, 255])),
+    (np.array([179, 100, 100]), np.array([180, 255, 255])),
+)
+
+_lut_cache = {}
+
+
+def _bands_key(bands):
+    return tuple((tuple(int(v) for v in lower), tuple(int(v) for v in upper)) for lower, upper in bands)
+
+
+def inrange_mask(image, bands=RED_BANDS):
+    """原来的做法：转HSV后每个区间一次inRange再或起来（用作对照）"""
+    if image.shape[2] == 4:
+        image = cv2.cvtColor(image, cv2.COLOR_BGRA2BGR)
+    hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
+    mask = np.zeros(image.shape[:2], dtype=np.uint8)
+    for lower, upper in bands:
+        cv2.bitwise_or(mask, cv2.inRange(hsv, lower, upper), dst=mask)
+    return mask
+
+
+def build_lut(bands=RED_BANDS):
+    """
+    查找表：下标是 B | G<<8 | R<<16（正好是小端BGRA像素当uint32看时的低24位），值是0/255。
+    表本身就是把所有1677万种颜色走一遍原来的inRange，所以结果和原来逐像素一致。
+    同样的区间只算一次（约0.2秒，16MB）。
+    """
+    key = _bands_key(bands)
+    if key not in _lut_cache:
+        colors = np.arange(1 << 24, dtype=np.uint32).view(np.uint8).reshape(4096, 4096, 4)
+        _lut_cache[key] = inrange_mask(colors, bands).ravel()
+    return _lut_cache[key]
+
+
+class RedMask:
+    """
+    m = RedMask(bands, downscale=2)
+    mask = m(bgra)                 # 整帧
+    mask = m(bgra, (x, y, w, h))   # 只更新一个矩形，其余保留上一次的结果
+
+    返回的掩膜是内部缓冲区，下一次调用会被覆盖。
+    downscale>1 时隔downscale个像素取一个，掩膜尺寸是原图的1/downscale（坐标要乘回去）。
+    """
+
+    def __init__(self, bands=RED_BANDS, downscale=1):
+        if sys.byteorder != 'little':
+            raise RuntimeError('查找表按小端BGRA排列')
+        self.lut = build_lut(bands)
+        self.downscale = downscale
+        self.shape = None
+
+    def _allocate(self, height, width):
+        f = self.downscale
+        self.shape = (height, width)
+        size = (-(-height // f), -(-width // f))
+        self.index = np.empty(size, dtype=np.uint32)
+        self.mask = np.empty(size, dtype=np.uint8)
+        self.bgra = None
+
+    def __call__(self, image, rect=None):
+        if image.shape[:2] != self.shape:
+            self._allocate(*image.shape[:2])
+            rect = None
+        if image.shape[2] == 3:
+            # BGR的图片（cv2.imread读的）先补一个alpha通道
+            if self.bgra is None:
+                self.bgra = np.empty(image.shape[:2] + (4,), dtype=np.uint8)
+            image = cv2.cvtColor(image, cv2.COLOR_BGR2BGRA, dst=self.bgra)
+        elif not image.flags.c_contiguous:
+            image = np.ascontiguousarray(image)
+
+        f = self.downscale
+        if rect is None:
+            rows, cols = slice(None), slice(None)
+            src_rows, src_cols = slice(None, None, f), slice(None, None, f)
+        else:
+            x, y, w, h = rect
+            r0, r1 = -(-y // f), -(-(y + h) // f)
+            c0, c1 = -(-x // f), -(-(x + w) // f)
+            rows, cols = slice(r0, r1), slice(c0, c1)
+            src_rows, src_cols = slice(r0 * f, r1 * f, f), slice(c0 * f, c1 * f, f)
+
+        pixels = image.view(np.uint32)[:, :, 0]
+        index = self.index[rows, cols]
+        np.bitwise_and(pixels[src_rows, src_cols], 0xFFFFFF, out=index)   # 去掉alpha
+        np.take(self.lut, index, out=self.mask[rows, cols], mode='clip')
+        return self.mask
+
+
+def verify(images, bands=RED_BANDS, downscales=(1, 2, 3)):
+    """
+    拿查找表的结果和原来两段inRange的结果逐像素比较，返回不一致的像素总数。
+    images里除了给的图片，还会加一张随机噪声图覆盖各种颜色。
+    """
+    rng = np.random.default_rng(0)
+    images = list(images) + [('noise', rng.integers(0, 256, (517, 933, 4), dtype=np.uint8))]
+    bad = 0
+    for name, image in images:
+        reference = inrange_mask(image, bands)
+        for f in downscales:
+            got = RedMask(bands, downscale=f)(image)
+            diff = int(np.count_nonzero(got != reference[::f, ::f]))
+            bad += diff
+            print(f"{name} downscale={f}: {'OK' if diff == 0 else f'{diff} 个像素不一致'}")
+        # 局部更新和整帧结果一致
+        m = RedMask(bands)
+        m(np.zeros_like(image))
+        h, w = image.shape[:2]
+        diff = 0
+        for x, y, rw, rh in ((0, 0, w, h // 2), (w // 3, h // 3, w // 2, h - h // 3)):
+            m(image, (x, y, rw, rh))
+            diff += int(np.count_nonzero(m.mask[y:y + rh, x:x + rw] != reference[y:y + rh, x:x + rw]))
+        bad += diff
+        print(f"{name} 局部更新: {'OK' if diff == 0 else f'{diff} 个像素不一致'}")
+    return bad
+
+
+if __name__ == '__main__':
+    folder = sys.argv[1] if len(sys.argv) > 1 else '../images'
+    start = time.perf_counter()
+    build_lut()
+    print(f"建表用时 {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    samples = []
+    for name in sorted(os.listdir(folder)):
+        if name.lower().endswith(('.png', '.jpg', '.jpeg', '.bmp')):
+            image = cv2.imdecode(np.fromfile(os.path.join(folder, name), dtype=np.uint8), cv2.IMREAD_COLOR)
+            if image is not None:
+                samples.append((name, image))
+
+    bad = verify(samples)
+    for name, image in samples:
+        bgra = cv2.cvtColor(image, cv2.COLOR_BGR2BGRA)
+        m = RedMask()
+        m(bgra)
+        n = 20
+        t0 = time.perf_counter()
+        for _ in range(n):
+            m(bgra)
+        t1 = time.perf_counter()
+        for _ in range(n):
+            inrange_mask(bgra)
+        t2 = time.perf_counter()
+        print(f"{name}: 查表 {(t1 - t0) / n * 1000:.2f} ms, 原来 {(t2 - t1) / n * 1000:.2f} ms")
+    sys.exit(1 if bad else 0)
@@ -0,0 +1,192 @@
+#离线回放测速：把录好的帧序列（或images/里的截图）按顺序走一遍真实的 变化检测 → 掩膜 → 轮廓 → 判断 流程，
+#点击换成只做记录的假后端（input_backend.MockBackend），不需要屏幕和QQ，linux无头也能跑
+#  python replay.py ../images --labels replay_labels.json --repeat 20 --save baseline.json
+#  python replay.py ../images --labels replay_labels.json --repeat 20 --compare baseline.json
+#和基线比较变慢/判断变差时返回码为1
+
+import argparse
+import json
+import sys
+import time
+
+import numpy as np
+
+from capture import CaptureEngine, DirectorySource
+from detect import ENGINES, get_engine
+from dirty import ChangeGate
+from input_backend import MockBackend
+from popup import PopupMachine
+from redbag import lower_red1, lower_red2, observe, upper_red1, upper_red2
+from verifier import TemplateVerifier
+
+STAGES = ('gate', 'mask', 'detect', 'decide', 'act')
+
+
+def load_frames(folder):
+    """按文件名顺序读出文件夹里的所有帧，返回 [(文件名, BGRA), ...]"""
+    source = DirectorySource(folder, loop=False)
+    frames = []
+    for path in source.paths:
+        frames.append((path.replace('\\', '/').rsplit('/', 1)[-1], source.grab()))
+    return frames
+
+
+def classify(target, close):
+    """单帧的判断结果：红包页面优先，其次是未领取的红包"""
+    if close is not None:
+        return 'popup', close
+    if target is not None:
+        return 'open', target
+    return 'none', None
+
+
+def percentiles(samples):
+    if not samples:
+        return {'count': 0, 'p50': 0.0, 'p95': 0.0, 'p99': 0.0}
+    ms = np.array(samples) * 1000
+    p50, p95, p99 = np.percentile(ms, (50, 95, 99))
+    return {'count': len(samples), 'p50': float(p50), 'p95': float(p95), 'p99': float(p99)}
+
+
+def replay(frames, engine_name='contours', repeat=1, fps=30, labels=None, tolerance=3, verifier=None):
+    """
+    把frames回放repeat遍。状态机用虚拟时间（第k帧在 k/fps 秒），这样超时和实时跑的时候一样。
+    给了verifier（verifier.TemplateVerifier）就在判断时加上模板校验，耗时算在decide里。
+    返回结果字典（可以直接存成json）。
+    """
+    engine = CaptureEngine(None, lower_red1, upper_red1, lower_red2, upper_red2)
+    gate = ChangeGate()
+    find_blobs = get_engine(engine_name)
+    machine = PopupMachine()
+    backend = MockBackend()
+    timings = {stage: [] for stage in STAGES}
+    seen = (None, None)
+    labels = labels or {}
+    correct, mismatches = 0, []
+
+    start = time.perf_counter()
+    k = 0
+    for r in range(repeat):
+        for name, raw in frames:
+            t0 = time.perf_counter()
+            rects = gate.update(raw)
+            t1 = time.perf_counter()
+            timings['gate'].append(t1 - t0)
+            if rects:
+                _, mask = engine.process(raw, rects)
+                t2 = time.perf_counter()
+                features = find_blobs(mask)
+                t3 = time.perf_counter()
+                timings['mask'].append(t2 - t1)
+                timings['detect'].append(t3 - t2)
+                t1 = t3
+                seen = observe(features, image=raw, verifier=verifier)
+            target, close = seen
+            action = machine.step(k / fps, target, close)
+            t2 = time.perf_counter()
+            timings['decide'].append(t2 - t1)
+            if action is not None:
+                backend.click(*action[1])
+                timings['act'].append(time.perf_counter() - t2)
+            k += 1
+
+            # 标注只在第一遍统计
+            if r == 0 and name in labels:
+                kind, point = classify(target, close)
+                label = labels[name]
+                ok = kind == label['kind']
+                if ok and 'point' in label:
+                    ok = max(abs(a - b) for a, b in zip(point, label['point'])) <= tolerance
+                if ok:
+                    correct += 1
+                else:
+                    mismatches.append({'frame': name, 'expected': label, 'got': [kind, point]})
+    elapsed = time.perf_counter() - start
+
+    labelled = sum(1 for name, _ in frames if name in labels)
+    return {
+        'engine': engine_name,
+        'frames': k,
+        'seconds': elapsed,
+        'fps': k / elapsed if elapsed > 0 else 0.0,
+        'stages': {stage: percentiles(samples) for stage, samples in timings.items()},
+        'labelled': labelled,
+        'accuracy': correct / labelled if labelled else None,
+        'mismatches': mismatches,
+        'click_count': len(backend.events),
+        'verified': verifier is not None,
+    }
+
+
+def compare(result, baseline, tolerance=0.25, floor_ms=0.05):
+    """
+    和基线比较，返回不合格项的说明列表（空列表表示通过）。
+    各阶段p95/fps允许tolerance比例的波动；低于floor_ms的阶段太快，抖动比例太大，不比较。
+    """
+    failures = []
+    for stage, base in baseline['stages'].items():
+        now = result['stages'].get(stage)
+        if now is None or base['count'] == 0 or base['p95'] < floor_ms:
+            continue
+        if now['p95'] > base['p95'] * (1 + tolerance):
+            failures.append(f"{stage} p95 {now['p95']:.2f} ms > 基线 {base['p95']:.2f} ms")
+    if result['fps'] < baseline['fps'] / (1 + tolerance):
+        failures.append(f"fps {result['fps']:.1f} < 基线 {baseline['fps']:.1f}")
+    if baseline.get('accuracy') is not None and (result['accuracy'] or 0) < baseline['accuracy']:
+        failures.append(f"准确率 {result['accuracy']} < 基线 {baseline['accuracy']}")
+    return failures
+
+
+def print_result(result):
+    print(f"引擎 {result['engine']}：{result['frames']} 帧 {result['seconds']:.2f}s，{result['fps']:.1f} fps，"
+          f"点击 {result['click_count']} 次")
+    for stage, st in result['stages'].items():
+        print(f"  {stage:7s} {st['count']:6d} 次  p50 {st['p50']:7.3f}  p95 {st['p95']:7.3f}  p99 {st['p99']:7.3f} ms")
+    if result['accuracy'] is not None:
+        print(f"  准确率 {result['accuracy'] * 100:.1f}%（{result['labelled']} 帧有标注）")
+        for miss in result['mismatches']:
+            print(f"    {miss['frame']}: 应为 {miss['expected']}，实际 {miss['got']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='红包检测离线回放测速')
+    parser.add_argument('folder', nargs='?', default='../images', help='帧序列/截图文件夹（按文件名排序）')
+    parser.add_argument('--labels', help='标注json：{文件名: {"kind": "open|popup|none", "point": [x, y]}}')
+    parser.add_argument('--engine', default='contours', choices=sorted(ENGINES))
+    parser.add_argument('--repeat', type=int, default=10, help='整个序列回放几遍')
+    parser.add_argument('--fps', type=float, default=30, help='序列的录制帧率（状态机的虚拟时间）')
+    parser.add_argument('--save', help='把结果存成基线json')
+    parser.add_argument('--compare', help='和这个基线json比较，变差时返回码为1')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='耗时允许的波动比例')
+    parser.add_argument('--verify', action='store_true', help='加上模板校验（verifier.py）')
+    args = parser.parse_args()
+
+    labels = None
+    if args.labels:
+        with open(args.labels, encoding='utf-8') as f:
+            labels = json.load(f)
+
+    verifier = TemplateVerifier() if args.verify else None
+    result = replay(load_frames(args.folder), args.engine, args.repeat, args.fps, labels, verifier=verifier)
+    print_result(result)
+    if verifier is not None:
+        print(' ', verifier.report())
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print('基线已保存到', args.save)
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        failures = compare(result, baseline, args.tolerance)
+        for failure in failures:
+            print('变差了:', failure)
+        if failures:
+            sys.exit(1)
+        print('和基线相比没有变差')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,154 @@
+#各阶段耗时统计：每个阶段一个环形缓冲区，只留最近window次的耗时和结束时间，随时算fps和p50/p95/p99
+#可以在终端刷新一行或者开一个opencv小窗口显示（HUD），也可以定时导出成csv/json
+#不需要统计时就不要建Telemetry：用到它的地方在建对象时就选好不计时的那条路，关掉以后一次计时都没有
+
+import csv
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+# 导出直方图用的分桶（毫秒，按对数分），最后一个桶收所有更慢的
+HIST_EDGES_MS = (0, 0.1, 0.2, 0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+
+class StageTimer:
+    """一个阶段最近window次的耗时（秒）和结束时间"""
+
+    def __init__(self, window=1000):
+        self.durations = np.zeros(window)
+        self.ends = np.zeros(window)
+        self.window = window
+        self.count = 0      # 总次数（不只是窗口里的）
+
+    def add(self, duration, end):
+        i = self.count % self.window
+        self.durations[i] = duration
+        self.ends[i] = end
+        self.count += 1
+
+    def snapshot(self):
+        n = min(self.count, self.window)
+        if n == 0:
+            return {'count': 0, 'fps': 0.0, 'p50': 0.0, 'p95': 0.0, 'p99': 0.0, 'max': 0.0,
+                    'hist': [0] * len(HIST_EDGES_MS)}
+        # 环形缓冲区写到一半时也会被读，拷一份再算，顶多差一两个样本
+        ms = self.durations[:n].copy() * 1000
+        ends = self.ends[:n]
+        span = ends.max() - ends.min()
+        p50, p95, p99 = np.percentile(ms, (50, 95, 99))
+        hist = np.histogram(ms, bins=list(HIST_EDGES_MS) + [np.inf])[0]
+        return {'count': self.count, 'fps': (n - 1) / span if span > 0 else 0.0,
+                'p50': float(p50), 'p95': float(p95), 'p99': float(p99), 'max': float(ms.max()),
+                'hist': hist.tolist()}
+
+
+class Telemetry:
+    """
+    add(stage, start) 记一次从start（time.perf_counter()）到现在的耗时，返回现在的时间，方便接着记下一段：
+        t = time.perf_counter()
+        rects = gate.update(raw)
+        t = telemetry.add('gate', t)
+    阶段名第一次出现时自动建；各线程记各自的阶段，互不干扰。
+    """
+
+    def __init__(self, window=1000):
+        self.window = window
+        self.stages = {}
+        self.started = time.perf_counter()
+
+    def _timer(self, stage):
+        timer = self.stages.get(stage)
+        if timer is None:
+            timer = self.stages.setdefault(stage, StageTimer(self.window))
+        return timer
+
+    def add(self, stage, start):
+        now = time.perf_counter()
+        self._timer(stage).add(now - start, now)
+        return now
+
+    def add_duration(self, stage, seconds):
+        """直接记一个已经算好的耗时（比如点开红包到红包页面弹出用了多久）"""
+        self._timer(stage).add(seconds, time.perf_counter())
+
+    def snapshot(self):
+        return {stage: timer.snapshot() for stage, timer in list(self.stages.items())}
+
+    def lines(self):
+        lines = []
+        for stage, st in self.snapshot().items():
+            lines.append(f"{stage:14s} {st['fps']:6.1f}/s  p50 {st['p50']:7.2f}  p95 {st['p95']:7.2f}  "
+                         f"p99 {st['p99']:7.2f} ms")
+        return lines
+
+    def report(self):
+        return '\n'.join(["各阶段耗时（最近%d次）：" % self.window] + self.lines())
+
+    def export(self, path):
+        """json：整份覆盖写；csv：每次追加一批行（每个阶段一行），可以画出随时间的变化"""
+        now = time.time()
+        snapshot = self.snapshot()
+        if path.endswith('.json'):
+            tmp = path + '.tmp'
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump({'time': now, 'uptime': time.perf_counter() - self.started,
+                           'hist_edges_ms': HIST_EDGES_MS, 'stages': snapshot}, f, ensure_ascii=False, indent=1)
+            os.replace(tmp, path)
+            return
+        new = not os.path.exists(path)
+        with open(path, 'a', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            if new:
+                writer.writerow(['time', 'stage', 'count', 'fps', 'p50_ms', 'p95_ms', 'p99_ms', 'max_ms'])
+            for stage, st in snapshot.items():
+                writer.writerow([f"{now:.3f}", stage, st['count'], f"{st['fps']:.2f}", f"{st['p50']:.3f}",
+                                 f"{st['p95']:.3f}", f"{st['p99']:.3f}", f"{st['max']:.3f}"])
+
+
+class Hud:
+    """
+    在主线程里定时调用update()：
+      'terminal' 在终端同一行刷新各阶段的fps和p95
+      'window'   开一个opencv窗口，每个阶段一行
+    export给了路径就每隔export_interval秒导出一次。
+    """
+
+    def __init__(self, telemetry, mode='terminal', export=None, export_interval=10.0):
+        self.telemetry = telemetry
+        self.mode = mode
+        self.export_path = export
+        self.export_interval = export_interval
+        self.last_export = time.perf_counter()
+
+    def update(self):
+        snapshot = self.telemetry.snapshot()
+        if self.mode == 'terminal':
+            parts = [f"{stage} {st['fps']:.0f}/s p95 {st['p95']:.1f}ms" for stage, st in snapshot.items()]
+            sys.stdout.write('\r' + ' | '.join(parts) + '\x1b[K')
+            sys.stdout.flush()
+        elif self.mode == 'window':
+            self._show(snapshot)
+        if self.export_path and time.perf_counter() - self.last_export >= self.export_interval:
+            self.telemetry.export(self.export_path)
+            self.last_export = time.perf_counter()
+
+    def _show(self, snapshot):
+        import cv2
+        lines = [f"{stage:14s} {st['fps']:6.1f}/s  p95 {st['p95']:6.2f} ms" for stage, st in snapshot.items()]
+        image = np.zeros((20 * len(lines) + 10, 420, 3), np.uint8)
+        for i, line in enumerate(lines):
+            cv2.putText(image, line, (5, 20 * i + 20), cv2.FONT_HERSHEY_PLAIN, 1, (0, 255, 0), 1)
+        cv2.imshow('telemetry', image)
+        cv2.waitKey(1)
+
+    def close(self):
+        if self.mode == 'terminal':
+            sys.stdout.write('\n')
+        elif self.mode == 'window':
+            import cv2
+            cv2.destroyWindow('telemetry')
+        if self.export_path:
+            self.telemetry.export(self.export_path)
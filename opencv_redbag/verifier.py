@@ -0,0 +1,194 @@
+#模板校验：颜色掩膜找到候选以后，只在候选的ROI里和images/里的参考截图做归一化模板匹配，给出置信度
+#  未领取的红包.png / 已领取的红包.png ：候选红包更像哪一个，像已领取的就不点
+#  红包页面.png                        ：关闭按钮附近是不是真的有那个×
+#模板启动时读一次，按屏幕缩放系数缩成几种大小缓存起来，每帧只缩放ROI；匹配在缩小的G通道上做
+#单独看得分和耗时：python verifier.py ../images
+
+import os
+import sys
+import threading
+import time
+
+import cv2
+import numpy as np
+
+IMAGES = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'images')
+
+UNCLAIMED = 'unclaimed'
+CLAIMED = 'claimed'
+POPUP = 'popup'
+
+# 参考截图（1920*1080、100%缩放下截的），红包页面只取右上角关闭按钮那一块 (x, y, w, h)
+TEMPLATE_FILES = {
+    UNCLAIMED: ('未领取的红包.png', None),
+    CLAIMED: ('已领取的红包.png', None),
+    POPUP: ('红包页面.png', (902, 70, 48, 48)),
+}
+
+# 只用G通道匹配：红色在G通道里最暗，白色的×和字最亮，灰色背景在中间；
+# 灰度图里红色和灰色背景亮度差不多，×附近的一块灰背景也能得到很高的分
+CHANNEL = 1
+
+# 各模板匹配前缩小的倍数：红包大，缩3倍还看得清字；×很小，只缩2倍
+SHRINK = {UNCLAIMED: 3, CLAIMED: 3, POPUP: 2}
+
+
+def load_template(kind, folder=IMAGES):
+    """读一张参考截图（支持中文路径），取G通道，需要的话裁出一块"""
+    name, crop = TEMPLATE_FILES[kind]
+    image = cv2.imdecode(np.fromfile(os.path.join(folder, name), dtype=np.uint8), cv2.IMREAD_COLOR)
+    if image is None:
+        raise FileNotFoundError(f"读不到模板 {os.path.join(folder, name)}")
+    image = image[:, :, CHANNEL]
+    if crop is not None:
+        x, y, w, h = crop
+        image = image[y:y + h, x:x + w]
+    return np.ascontiguousarray(image)
+
+
+class TemplateVerifier:
+    """
+    score(image, rect, kind, scale) 返回ROI里和模板最像的地方的相关系数（-1~1，TM_CCOEFF_NORMED），
+    在几种模板大小里取最大的。image是BGRA/BGR整帧，rect是候选的外接矩形（原图坐标）。
+    scale是屏幕缩放系数（redbag.Geometry.scale），模板按 scale*scales 缩放后按scale缓存。
+    """
+
+    def __init__(self, folder=IMAGES, scales=(0.9, 1.0, 1.1), packet_threshold=0.6, popup_threshold=0.6):
+        self.scales = scales
+        self.packet_threshold = packet_threshold    # 像未领取的红包的得分至少这么多，并且比像已领取的高
+        self.popup_threshold = popup_threshold      # 关闭按钮的得分至少这么多
+        self.originals = {kind: load_template(kind, folder) for kind in TEMPLATE_FILES}
+        self.cache = {}             # (kind, scale) -> [缩小后的模板, ...]
+        # 每块屏幕的检测线程共用一个校验器，计数和耗时在锁里累加
+        self.count_lock = threading.Lock()
+        self.counts = {UNCLAIMED: 0, POPUP: 0}
+        self.rejected = {UNCLAIMED: 0, POPUP: 0}
+        self.busy = {UNCLAIMED: 0.0, POPUP: 0.0}
+
+    def templates(self, kind, scale=1.0):
+        key = (kind, round(scale, 3))
+        if key not in self.cache:
+            original = self.originals[kind]
+            shrink = SHRINK[kind]
+            resized = []
+            for s in self.scales:
+                size = (max(round(original.shape[1] * scale * s / shrink), 1),
+                        max(round(original.shape[0] * scale * s / shrink), 1))
+                resized.append(cv2.resize(original, size, interpolation=cv2.INTER_AREA))
+            self.cache[key] = resized
+        return self.cache[key]
+
+    def _roi(self, image, rect, shrink):
+        """裁出ROI（不超出画面），取G通道再缩小"""
+        x, y, w, h = (int(v) for v in rect)
+        height, width = image.shape[:2]
+        x0, y0, x1, y1 = max(x, 0), max(y, 0), min(x + w, width), min(y + h, height)
+        if x1 - x0 < shrink or y1 - y0 < shrink:
+            return None
+        roi = image[y0:y1, x0:x1]
+        if roi.ndim == 3:
+            roi = cv2.extractChannel(roi, CHANNEL)
+        size = ((x1 - x0) // shrink, (y1 - y0) // shrink)
+        return cv2.resize(roi, size, interpolation=cv2.INTER_AREA)
+
+    def _best(self, roi, kind, scale):
+        best = -1.0
+        if roi is None:
+            return best
+        for template in self.templates(kind, scale):
+            if template.shape[0] > roi.shape[0] or template.shape[1] > roi.shape[1]:
+                continue
+            best = max(best, float(cv2.matchTemplate(roi, template, cv2.TM_CCOEFF_NORMED).max()))
+        return best
+
+    def score(self, image, rect, kind, scale=1.0):
+        return self._best(self._roi(image, rect, SHRINK[kind]), kind, scale)
+
+    def packet_scores(self, image, rect, scale=1.0):
+        """候选红包像未领取/已领取红包的得分；ROI四周各放宽外接矩形的10%，给模板留一点滑动的余地"""
+        x, y, w, h = rect
+        pad = int(max(w, h) * 0.1) + SHRINK[UNCLAIMED]
+        roi = self._roi(image, (x - pad, y - pad, w + 2 * pad, h + 2 * pad), SHRINK[UNCLAIMED])
+        return self._best(roi, UNCLAIMED, scale), self._best(roi, CLAIMED, scale)
+
+    def is_unclaimed(self, image, rect, scale=1.0):
+        start = time.perf_counter()
+        unclaimed, claimed = self.packet_scores(image, rect, scale)
+        ok = unclaimed >= self.packet_threshold and unclaimed > claimed
+        self._count(UNCLAIMED, ok, start)
+        return ok
+
+    def popup_score(self, image, point, scale=1.0):
+        """以预计的关闭按钮坐标为中心、模板两倍大小的窗口里找×"""
+        half = round(self.originals[POPUP].shape[0] * scale)
+        x, y = point
+        return self.score(image, (x - half, y - half, 2 * half, 2 * half), POPUP, scale)
+
+    def is_popup(self, image, point, scale=1.0):
+        start = time.perf_counter()
+        ok = self.popup_score(image, point, scale) >= self.popup_threshold
+        self._count(POPUP, ok, start)
+        return ok
+
+    def _count(self, kind, ok, start):
+        elapsed = time.perf_counter() - start
+        with self.count_lock:
+            self.counts[kind] += 1
+            self.busy[kind] += elapsed
+            if not ok:
+                self.rejected[kind] += 1
+
+    def report(self):
+        parts = []
+        for kind, name in ((UNCLAIMED, '红包'), (POPUP, '红包页面')):
+            with self.count_lock:
+                count, busy, rejected = self.counts[kind], self.busy[kind], self.rejected[kind]
+            if count:
+                parts.append(f"{name} {count} 次 平均 {busy / count * 1000:.2f} ms 否决 {rejected} 次")
+        return "模板校验：" + ('，'.join(parts) if parts else "没有候选")
+
+
+def main(folder):
+    """在截图上看看校验的得分和耗时：每张图的红包候选和红包页面，再把两张红包截图贴到白底上互相比"""
+    from detect import contours_engine
+    from redbag import contours_check, close_redbag, open_redbag_candidates
+    from redmask import RedMask
+
+    verifier = TemplateVerifier()
+    red = RedMask()
+    for name in sorted(os.listdir(folder)):
+        if not name.lower().endswith(('.png', '.jpg', '.jpeg', '.bmp')):
+            continue
+        image = cv2.imdecode(np.fromfile(os.path.join(folder, name), dtype=np.uint8), cv2.IMREAD_COLOR)
+        if image is None:
+            continue
+        features = contours_engine(red(image).copy())
+        line = [name]
+        for row in open_redbag_candidates(features):
+            rect = tuple(int(v) for v in row[['x', 'y', 'w', 'h']].tolist())
+            unclaimed, claimed = verifier.packet_scores(image, rect)
+            line.append(f"红包{rect} 未领取 {unclaimed:.2f} 已领取 {claimed:.2f}")
+        row = contours_check(features)
+        if row is not False:
+            point = close_redbag(row)
+            line.append(f"红包页面{point} 关闭按钮 {verifier.popup_score(image, point):.2f}")
+        print(' | '.join(line))
+
+    for kind in (UNCLAIMED, CLAIMED):
+        packet = cv2.imdecode(np.fromfile(os.path.join(folder, TEMPLATE_FILES[kind][0]), dtype=np.uint8),
+                              cv2.IMREAD_COLOR)
+        canvas = np.full((400, 400, 3), 235, np.uint8)
+        h, w = packet.shape[:2]
+        canvas[81:81 + h, 101:101 + w] = packet
+        rect = (101, 81, w, h)
+        start = time.perf_counter()
+        for _ in range(100):
+            ok = verifier.is_unclaimed(canvas, rect)
+        elapsed = (time.perf_counter() - start) / 100
+        unclaimed, claimed = verifier.packet_scores(canvas, rect)
+        print(f"白底上的{TEMPLATE_FILES[kind][0]}：未领取 {unclaimed:.2f} 已领取 {claimed:.2f} → "
+              f"{'点' if ok else '不点'}，每个候选 {elapsed * 1000:.2f} ms")
+
+
+if __name__ == '__main__':
+    main(sys.argv[1] if len(sys.argv) > 1 else IMAGES)